@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+from redis.asyncio import Redis
+import time
+
+class RedisCache:
+    redis: Redis | None = None
+
+    @classmethod
+    async def init(cls, redis: Redis) -> None:
+        cls.redis = redis
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls.redis is not None:
+            await cls.redis.aclose()
+        cls.redis = None
+
+class LRUCache:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self.items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self.items[key]
+            return None
+        self.items.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self.items[key] = (time.monotonic() + ttl, value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self.items.pop(key, None)
+
+    def clear(self) -> None:
+        self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
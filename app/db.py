@@ -1,12 +1,42 @@
-from app.settings import DB_CONNECTION_STRING
-from sqlalchemy import create_engine, func, Interval
+from app.settings import DB_CONNECTION_STRING, DB_ASYNC_CONNECTION_STRING, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_REPLICA_URLS
+from app.metrics import TimedAsyncAdaptedQueuePool, instrument_engine
+from sqlalchemy import create_engine, func, Interval, SmallInteger, DateTime, extract, cast
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from datetime import timedelta
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from typing import AsyncIterator, List, Tuple
+from datetime import timedelta, date
+import calendar
 
+# sync engine is kept for migrations and seeds
 engine = create_engine(DB_CONNECTION_STRING)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    DB_ASYNC_CONNECTION_STRING,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    poolclass=TimedAsyncAdaptedQueuePool
+)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+replica_engines = [
+    create_async_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True, poolclass=TimedAsyncAdaptedQueuePool)
+    for url in DB_REPLICA_URLS
+]
+
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine.sync_engine)
+
+ReplicaSessionLocals = [async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False) for replica_engine in replica_engines]
+
 class Base(DeclarativeBase):
     pass
 
@@ -17,7 +47,14 @@ def get_db():
         yield db
     finally:
         db.close()
-        
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return AsyncSessionLocal
+
 def has_date_next_days(sa_col, next_days: int = 0):
     return age_years_at(sa_col, next_days) > age_years_at(sa_col)
 
@@ -30,3 +67,49 @@ def age_years_at(sa_col, next_days: int = 0):
     stmt = func.date_part("year", stmt)
     return stmt
 
+def month_day(sa_col):
+    """ ``month * 100 + day`` of a date column, e.g. 1231 for December 31 """
+    return cast(extract("month", sa_col) * 100 + extract("day", sa_col), SmallInteger)
+
+class utcnow(FunctionElement):
+    """
+    The UTC time at which the statement runs, not when its transaction started like ``now()``,
+    so rows written under a lock are stamped in the order the lock was taken.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "(clock_timestamp() AT TIME ZONE 'utc')"
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    # padded to the microseconds SQLAlchemy stores, so stored and bound values compare as strings
+    return "(strftime('%Y-%m-%d %H:%M:%f', 'now') || '000')"
+
+def upcoming_month_days(today: date, days: int) -> List[Tuple[int, int]]:
+    """
+    Inclusive ``month_day`` ranges covering the dates from tomorrow to ``today + days``.
+    February 29 is celebrated on March 1 in non-leap years.
+    """
+    if days <= 0:
+        return []
+    if days >= 365:
+        return [(101, 1231)]
+    start, end = today + timedelta(days=1), today + timedelta(days=days)
+    if start.year == end.year:
+        ranges = [(start, end)]
+    else:
+        ranges = [(start, date(start.year, 12, 31)), (date(end.year, 1, 1), end)]
+    result = []
+    for lo, hi in ranges:
+        lo_md, hi_md = lo.month * 100 + lo.day, hi.month * 100 + hi.day
+        if not calendar.isleap(lo.year) and lo_md <= 301 <= hi_md:
+            lo_md = min(lo_md, 229)
+        result.append((lo_md, hi_md))
+    return result
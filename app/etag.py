@@ -0,0 +1,19 @@
+from fastapi import Request
+import hashlib
+
+def make_etag(*parts) -> str:
+    """ Strong ETag of the representation identified by ``parts``, e.g. an id and a version """
+    return '"' + hashlib.sha256(":".join(map(str, parts)).encode()).hexdigest()[:32] + '"'
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """
+    Whether the ``If-None-Match`` header of the request matches ``etag``,
+    in which case a GET can be answered with 304 Not Modified.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
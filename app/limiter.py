@@ -0,0 +1,184 @@
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from app.cache import RedisCache
+from app.types import AuthDep
+from app import settings
+from typing import Callable, Dict, Tuple
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+class MemoryLimiter:
+    """
+    Token buckets kept in the process: a bucket holds up to ``times`` tokens and refills
+    at ``times / seconds`` tokens per second, every request takes one token.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        # key: tokens, last update, refill period
+        self.buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    def take(self, key: str, times: int, seconds: float, now: float | None = None) -> float:
+        """
+        Takes a token from the bucket of ``key``.
+
+        :param key: The limited identity and route.
+        :type key: str
+        :param times: The number of requests allowed per ``seconds``.
+        :type times: int
+        :param seconds: The period of the limit.
+        :type seconds: float
+        :param now: The monotonic time of the request.
+        :type now: float | None
+        :return: 0 if the request is allowed, otherwise the seconds until a token is available.
+        :rtype: float
+        """
+        now = time.monotonic() if now is None else now
+        rate = times / seconds
+        tokens = self.__tokens(key, times, rate, now)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, seconds)
+        if len(self.buckets) > self.maxsize:
+            self.prune(now)
+        return 0 if allowed else (1 - tokens) / rate
+
+    def drain(self, key: str, times: int, seconds: float, tokens: float, now: float | None = None) -> None:
+        """ Lowers the tokens of ``key`` to at most ``tokens``, which may be negative """
+        now = time.monotonic() if now is None else now
+        current = self.__tokens(key, times, times / seconds, now)
+        self.buckets[key] = (min(current, tokens), now, seconds)
+
+    def prune(self, now: float) -> None:
+        # a bucket untouched for its whole period is full again, the same as a missing one
+        self.buckets = { key: bucket for key, bucket in self.buckets.items() if now - bucket[1] < bucket[2] }
+
+    async def hit(self, key: str, times: int, seconds: float) -> float:
+        return self.take(key, times, seconds)
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def __tokens(self, key: str, times: int, rate: float, now: float) -> float:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return times
+        tokens, updated, _ = bucket
+        return min(times, tokens + (now - updated) * rate)
+
+class RedisLimiter(MemoryLimiter):
+    """
+    Decides locally with the in-process token buckets and shares the counters between
+    processes in batches: every ``sync_interval`` seconds the requests taken since the
+    last sync are added to per-window counters in Redis in one pipeline, and a key that
+    went over its limit across all processes is drained locally. The cluster-wide limit
+    can be exceeded by the requests made during one ``sync_interval``; in exchange no
+    request waits for Redis, and a Redis outage only makes the limits process-local.
+    """
+
+    def __init__(self, redis: Redis | None = None, sync_interval: float = 1, prefix: str = "ratelimit:", maxsize: int = 100_000) -> None:
+        super().__init__(maxsize=maxsize)
+        self.__redis = redis
+        self.sync_interval = sync_interval
+        self.prefix = prefix
+        # key: requests taken since the last sync, limit, period
+        self.pending: Dict[str, Tuple[int, int, float]] = {}
+        self.task: asyncio.Task | None = None
+
+    @property
+    def redis(self) -> Redis | None:
+        return self.__redis or RedisCache.redis
+
+    def take(self, key: str, times: int, seconds: float, now: float | None = None) -> float:
+        retry_after = super().take(key, times, seconds, now)
+        if not retry_after:
+            count, _, _ = self.pending.get(key, (0, times, seconds))
+            self.pending[key] = (count + 1, times, seconds)
+        return retry_after
+
+    async def sync(self) -> None:
+        """ Adds the pending requests to the Redis counters and drains the keys over their limit """
+        if not self.pending or self.redis is None:
+            return
+        pending, self.pending = self.pending, {}
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, (count, times, seconds) in pending.items():
+                window = f"{self.prefix}{key}:{int(now // seconds)}"
+                pipe.incrby(window, count)
+                pipe.expire(window, math.ceil(seconds))
+            results = await pipe.execute()
+        for (key, (count, times, seconds)), total in zip(pending.items(), results[::2]):
+            if total > times:
+                self.drain(key, times, seconds, times - total)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        try:
+            await self.sync()
+        except RedisError:
+            pass
+
+    async def __run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except RedisError:
+                logger.warning("Rate limit counters sync failed", exc_info=True)
+
+def create_limiter() -> MemoryLimiter:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryLimiter()
+    return RedisLimiter(sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL)
+
+limiter = create_limiter()
+
+def client_ip(request: Request) -> str:
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+async def current_user(user: AuthDep) -> str:
+    # resolved once per request, the route gets the same user
+    return f"user:{user.id}"
+
+def rate_limit(times: int, seconds: float, identifier: Callable = client_ip) -> Callable:
+    """
+    Dependency allowing ``times`` requests per ``seconds`` to a route for every identity
+    returned by ``identifier``.
+
+    :param times: The number of requests allowed per ``seconds``.
+    :type times: int
+    :param seconds: The period of the limit.
+    :type seconds: float
+    :param identifier: Dependency returning the identity the limit applies to.
+    :type identifier: Callable
+    :return: The dependency.
+    :rtype: Callable
+    """
+    async def dependency(request: Request, identity: str = Depends(identifier)) -> None:
+        # per path like fastapi-limiter, so updating one contact does not limit updating another
+        key = f"{request.method}:{request.url.path}:{identity}"
+        retry_after = await limiter.hit(key, times, seconds)
+        if retry_after:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests", headers={"Retry-After": str(math.ceil(retry_after))})
+    return dependency
@@ -1,3 +1,3 @@
-from .main import fm, SendMail
+from .main import mail_queue, template_registry, SendMail
 
-__all__ = [ "fm", "SendMail" ]
\ No newline at end of file
+__all__ = [ "mail_queue", "template_registry", "SendMail" ]
\ No newline at end of file
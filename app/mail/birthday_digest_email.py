@@ -0,0 +1,5 @@
+from app.mail import SendMail
+
+class BirthdayDigestEmail(SendMail):
+    subject = 'Upcoming birthdays of your contacts'
+    template = "birthday_digest.html"
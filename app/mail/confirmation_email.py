@@ -1,4 +1,4 @@
-from fastapi_mail import MessageSchema
+from app.mail.queue import MailJob
 from app.mail import SendMail
 from users.auth import auth
 
@@ -6,6 +6,6 @@ class ConfirmationEmail(SendMail):
     subject = 'Please confirm your email address'
     template = "confirm_email.html"
 
-    async def create_message(self, **body) -> MessageSchema:
+    async def create_message(self, **body) -> MailJob:
         body["token"] = await auth.token.create_email_confirm({"sub": self.email})
         return await super().create_message(**body)
\ No newline at end of file
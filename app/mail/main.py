@@ -1,9 +1,12 @@
-from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
-from fastapi_mail.errors import ConnectionErrors
+from fastapi_mail import ConnectionConfig
 from app import settings
+from app.mail.queue import MailJob, MailQueue, MemoryMailQueue, RedisMailQueue
+from app.mail.registry import TemplateRegistry
 from pathlib import Path
 from pydantic import EmailStr
+from redis.exceptions import RedisError
 
+# SMTP settings of the pooled sender, see app.mail.smtp and app.mail.worker
 conf = ConnectionConfig(
     MAIL_USERNAME=settings.SMTP_EMAIL,
     MAIL_PASSWORD=settings.SMTP_PASSWORD,
@@ -18,28 +21,29 @@ conf = ConnectionConfig(
     TEMPLATE_FOLDER=Path(__file__).parent / 'templates'
 )
 
-fm = FastMail(conf)
+template_registry = TemplateRegistry(conf.TEMPLATE_FOLDER)
+
+mail_queue: MailQueue = MemoryMailQueue() if settings.MAIL_QUEUE_BACKEND == "memory" else RedisMailQueue()
 
 class SendMail():
-    fm: FastMail = fm
-    subtype: MessageType = MessageType.html
+    queue: MailQueue = mail_queue
     subject: str
     template: str
 
     def __init__(self, email: EmailStr) -> None:
         self.email = email
 
-    async def create_message(self, **body) -> MessageSchema:
-        return MessageSchema(
+    async def create_message(self, **body) -> MailJob:
+        return MailJob(
+            recipient=self.email,
             subject=self.subject,
-            recipients=[self.email],
-            template_body=body,
-            subtype=self.subtype
+            template=self.template,
+            body=body
         )
 
     async def __call__(self, **kwds: dict) -> None:
         try:
             message = await self.create_message(**kwds)
-            await fm.send_message(message, template_name=self.template)
-        except ConnectionErrors as errors:
-            print(errors)
\ No newline at end of file
+            await self.queue.put(message)
+        except RedisError as errors:
+            print(errors)
@@ -0,0 +1,134 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, asdict
+from app.cache import RedisCache
+from typing import List
+from redis.asyncio import Redis
+import asyncio
+import heapq
+import json
+import time
+import uuid
+
+@dataclass
+class MailJob:
+    recipient: str
+    subject: str
+    template: str
+    body: dict
+    attempts: int = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def loads(cls, raw: str) -> "MailJob":
+        return cls(**json.loads(raw))
+
+class MailQueue(ABC):
+    """
+    Outbound mail queue. Jobs that failed with a temporary error are scheduled for a retry
+    after a delay, jobs that can not be delivered are moved to the dead letter list.
+    """
+
+    @abstractmethod
+    async def put(self, job: MailJob) -> None: ...
+
+    @abstractmethod
+    async def get_batch(self, size: int, timeout: float) -> List[MailJob]:
+        """
+        Waits up to ``timeout`` seconds for the first job and returns at most ``size`` jobs
+        that are ready to be sent, including the retries that are due.
+        """
+
+    @abstractmethod
+    async def retry(self, job: MailJob, delay: float) -> None: ...
+
+    @abstractmethod
+    async def dead(self, job: MailJob) -> None: ...
+
+    @abstractmethod
+    async def size(self) -> int: ...
+
+class MemoryMailQueue(MailQueue):
+    def __init__(self) -> None:
+        self.jobs: asyncio.Queue[MailJob] = asyncio.Queue()
+        self.delayed: List[tuple[float, str, MailJob]] = []
+        self.dead_jobs: List[MailJob] = []
+
+    async def put(self, job: MailJob) -> None:
+        self.jobs.put_nowait(job)
+
+    async def get_batch(self, size: int, timeout: float) -> List[MailJob]:
+        self.__release_due()
+        batch = []
+        if self.jobs.empty():
+            wait = timeout if not self.delayed else min(timeout, max(self.delayed[0][0] - time.monotonic(), 0))
+            try:
+                batch.append(await asyncio.wait_for(self.jobs.get(), wait))
+            except asyncio.TimeoutError:
+                self.__release_due()
+        while len(batch) < size and not self.jobs.empty():
+            batch.append(self.jobs.get_nowait())
+        return batch
+
+    async def retry(self, job: MailJob, delay: float) -> None:
+        heapq.heappush(self.delayed, (time.monotonic() + delay, job.id, job))
+
+    async def dead(self, job: MailJob) -> None:
+        self.dead_jobs.append(job)
+
+    async def size(self) -> int:
+        return self.jobs.qsize() + len(self.delayed)
+
+    def __release_due(self) -> None:
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.jobs.put_nowait(heapq.heappop(self.delayed)[2])
+
+class RedisMailQueue(MailQueue):
+    """
+    Redis backed queue shared by the API workers that enqueue and the mail worker
+    processes that drain it (``python -m app.mail.worker``). Ready jobs are kept in a list,
+    retries in a sorted set scored by the time they are due.
+
+    A job is removed from Redis when a worker takes it, so jobs of a worker that crashes
+    in the middle of a batch are lost.
+    """
+
+    def __init__(self, redis: Redis | None = None, prefix: str = "mail:") -> None:
+        self._redis = redis
+        self.ready_key = prefix + "ready"
+        self.delayed_key = prefix + "delayed"
+        self.dead_key = prefix + "dead"
+
+    @property
+    def redis(self) -> Redis:
+        # the API shares the connection opened in the app lifespan
+        return self._redis or RedisCache.redis
+
+    async def put(self, job: MailJob) -> None:
+        await self.redis.lpush(self.ready_key, job.dumps())
+
+    async def get_batch(self, size: int, timeout: float) -> List[MailJob]:
+        await self.__release_due()
+        first = await self.redis.brpop([self.ready_key], timeout=timeout)
+        if first is None:
+            return []
+        rest = await self.redis.rpop(self.ready_key, size - 1) if size > 1 else None
+        return [MailJob.loads(raw) for raw in [first[1], *(rest or [])]]
+
+    async def retry(self, job: MailJob, delay: float) -> None:
+        await self.redis.zadd(self.delayed_key, {job.dumps(): time.time() + delay})
+
+    async def dead(self, job: MailJob) -> None:
+        await self.redis.lpush(self.dead_key, job.dumps())
+
+    async def size(self) -> int:
+        return await self.redis.llen(self.ready_key) + await self.redis.zcard(self.delayed_key)
+
+    async def __release_due(self) -> None:
+        for raw in await self.redis.zrangebyscore(self.delayed_key, "-inf", time.time()):
+            # only the worker that removed the retry moves it back to the ready list
+            if await self.redis.zrem(self.delayed_key, raw):
+                await self.redis.rpush(self.ready_key, raw)
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound, select_autoescape
+from pathlib import Path
+from typing import Dict, List
+import asyncio
+import re
+
+@dataclass(frozen=True)
+class RenderedTemplate:
+    html: str
+    text: str
+
+class HTMLToText(HTMLParser):
+    """
+    Plain text alternative of a rendered HTML mail: block elements become lines,
+    links keep their target next to the link text.
+    """
+    block_tags = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+    skip_tags = {"head", "style", "script"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.links: List[str | None] = []
+        self.skip = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in self.skip_tags:
+            self.skip += 1
+        elif tag in self.block_tags:
+            self.parts.append("\n")
+        elif tag == "a":
+            self.links.append(dict(attrs).get("href"))
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.skip_tags:
+            self.skip -= 1
+        elif tag in self.block_tags:
+            self.parts.append("\n")
+        elif tag == "a" and self.links:
+            href = self.links.pop()
+            if href:
+                self.parts.append(f" ({href})")
+
+    def handle_data(self, data: str) -> None:
+        if not self.skip:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+    @classmethod
+    def convert(cls, html: str) -> str:
+        parser = cls()
+        parser.feed(html)
+        parser.close()
+        lines = (re.sub(" +", " ", line).strip() for line in "".join(parser.parts).splitlines())
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+class TemplateRegistry:
+    """
+    Compiles mail templates once and keeps them in memory, so rendering a message does no
+    template loading, file system checks or compilation.
+
+    The plain text alternative comes from a ``<name>.txt`` template next to ``<name>.html``.
+    Without one, a text template is derived once from the HTML template source, which works
+    for templates whose Jinja expressions are in text and attribute values.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.env = Environment(
+            loader=FileSystemLoader(folder),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False
+        )
+        self.text_env = self.env.overlay(autoescape=False)
+        self.templates: Dict[str, Template] = {}
+        self.text_templates: Dict[str, Template] = {}
+
+    def load(self) -> None:
+        for name in self.env.list_templates():
+            self.get(name)
+            if name.endswith(".html"):
+                self.get_text(name)
+
+    def get(self, name: str) -> Template:
+        template = self.templates.get(name)
+        if template is None:
+            template = self.templates[name] = self.env.get_template(name)
+        return template
+
+    def get_text(self, name: str) -> Template:
+        template = self.text_templates.get(name)
+        if template is None:
+            template = self.text_templates[name] = self.__compile_text(name)
+        return template
+
+    def render(self, name: str, body: dict) -> RenderedTemplate:
+        return RenderedTemplate(html=self.get(name).render(**body), text=self.get_text(name).render(**body))
+
+    async def render_async(self, name: str, body: dict) -> RenderedTemplate:
+        # rendering is CPU bound, keep it off the event loop
+        return await asyncio.to_thread(self.render, name, body)
+
+    def __compile_text(self, name: str) -> Template:
+        try:
+            return self.get(str(Path(name).with_suffix(".txt")))
+        except TemplateNotFound:
+            source, _, _ = self.env.loader.get_source(self.env, name)
+            return self.text_env.from_string(HTMLToText.convert(source))
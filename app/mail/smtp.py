@@ -0,0 +1,71 @@
+from contextlib import asynccontextmanager
+from fastapi_mail import ConnectionConfig
+from typing import AsyncIterator, List
+import aiosmtplib
+import asyncio
+
+class SMTPPool:
+    """
+    Keeps up to ``size`` authenticated SMTP sessions open and hands them out one at a time,
+    so the TLS handshake and login are paid once per session instead of once per message.
+    The pool size is also the number of messages sent concurrently.
+    """
+
+    def __init__(self, config: ConnectionConfig, size: int) -> None:
+        self.config = config
+        self.size = size
+        self.idle: asyncio.Queue[aiosmtplib.SMTP] = asyncio.Queue()
+        self.connections: List[aiosmtplib.SMTP] = []
+        self.lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        smtp = await self.__acquire()
+        try:
+            yield smtp
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, OSError):
+            # the session is broken, the next acquire reconnects it
+            smtp.close()
+            raise
+        finally:
+            self.idle.put_nowait(smtp)
+
+    async def close(self) -> None:
+        for smtp in self.connections:
+            if smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except aiosmtplib.SMTPException:
+                    smtp.close()
+        self.connections = []
+        self.idle = asyncio.Queue()
+
+    async def __acquire(self) -> aiosmtplib.SMTP:
+        async with self.lock:
+            if self.idle.empty() and len(self.connections) < self.size:
+                smtp = self.__create()
+                self.connections.append(smtp)
+                self.idle.put_nowait(smtp)
+        smtp = await self.idle.get()
+        if not smtp.is_connected:
+            try:
+                await self.__connect(smtp)
+            except BaseException:
+                self.idle.put_nowait(smtp)
+                raise
+        return smtp
+
+    def __create(self) -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS
+        )
+
+    async def __connect(self, smtp: aiosmtplib.SMTP) -> None:
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD)
@@ -0,0 +1,146 @@
+"""
+Drains the outbound mail queue:
+
+    python -m app.mail.worker
+"""
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from fastapi_mail import ConnectionConfig
+from app import settings
+from app.mail.main import conf, template_registry
+from app.mail.queue import MailJob, MailQueue, RedisMailQueue
+from app.mail.registry import TemplateRegistry
+from app.mail.smtp import SMTPPool
+import aiosmtplib
+import asyncio
+import logging
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+class MailWorker:
+    def __init__(self, queue: MailQueue, pool: SMTPPool, config: ConnectionConfig = conf, registry: TemplateRegistry = template_registry, batch_size: int = 50, max_attempts: int = 5, backoff: float = 2) -> None:
+        self.queue = queue
+        self.pool = pool
+        self.config = config
+        self.registry = registry
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.task: asyncio.Task | None = None
+
+    async def process_batch(self, timeout: float = 1) -> int:
+        """
+        Sends one batch of queued messages concurrently over the pooled SMTP sessions.
+
+        :param timeout: Seconds to wait for the first message.
+        :type timeout: float
+        :return: The number of messages taken from the queue.
+        :rtype: int
+        """
+        jobs = await self.queue.get_batch(self.batch_size, timeout)
+        # one failing job must not abandon the sends of the others
+        results = await asyncio.gather(*(self.__send(job) for job in jobs), return_exceptions=True)
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error("Mail %s to %s failed", job.id, job.recipient, exc_info=result)
+        return len(jobs)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Mail queue batch failed")
+                await asyncio.sleep(self.backoff)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.pool.close()
+
+    def stats(self) -> dict:
+        return { "sent": self.sent, "retried": self.retried, "failed": self.failed }
+
+    async def build_message(self, job: MailJob) -> EmailMessage:
+        rendered = await self.registry.render_async(job.template, job.body)
+        message = EmailMessage()
+        message["Subject"] = job.subject
+        message["From"] = formataddr((self.config.MAIL_FROM_NAME, self.config.MAIL_FROM))
+        message["To"] = job.recipient
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid()
+        message.set_content(rendered.text)
+        message.add_alternative(rendered.html, subtype="html")
+        return message
+
+    async def __send(self, job: MailJob) -> None:
+        job.attempts += 1
+        try:
+            message = await self.build_message(job)
+        except Exception as e:
+            # a missing template or body key fails the same way on every attempt
+            self.failed += 1
+            logger.warning("Mail %s to %s could not be rendered: %r", job.id, job.recipient, e)
+            await self.queue.dead(job)
+            return
+        try:
+            async with self.pool.connection() as smtp:
+                await smtp.send_message(message)
+            self.sent += 1
+        except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused, aiosmtplib.SMTPDataError) as e:
+            # rejected by the server, retrying will not help unless it is a temporary (4xx) rejection
+            if isinstance(e, aiosmtplib.SMTPResponseException) and e.code < 500:
+                await self.__retry(job, e)
+            else:
+                self.failed += 1
+                logger.warning("Mail %s to %s rejected: %s", job.id, job.recipient, e)
+                await self.queue.dead(job)
+        except (aiosmtplib.SMTPException, OSError) as e:
+            await self.__retry(job, e)
+
+    async def __retry(self, job: MailJob, error: Exception) -> None:
+        if job.attempts >= self.max_attempts:
+            self.failed += 1
+            logger.warning("Mail %s to %s failed after %s attempts: %s", job.id, job.recipient, job.attempts, error)
+            await self.queue.dead(job)
+            return
+        self.retried += 1
+        await self.queue.retry(job, self.backoff * 2 ** (job.attempts - 1))
+
+def create_worker(queue: MailQueue) -> MailWorker:
+    return MailWorker(
+        queue=queue,
+        pool=SMTPPool(conf, size=settings.MAIL_POOL_SIZE),
+        batch_size=settings.MAIL_BATCH_SIZE,
+        max_attempts=settings.MAIL_MAX_ATTEMPTS,
+        backoff=settings.MAIL_RETRY_BACKOFF
+    )
+
+async def main() -> None:
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0, encoding='utf-8', decode_responses=True)
+    template_registry.load()
+    worker = create_worker(RedisMailQueue(r))
+    try:
+        await worker.run()
+    finally:
+        await worker.stop()
+        await r.aclose()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
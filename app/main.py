@@ -1,18 +1,48 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from contacts.routes import router as contacts_router 
 from users.routes import auth_router, user_router
-from app.settings import BASE_URL_PREFIX, APP_HOST, APP_PORT, REDIS_PORT, REDIS_HOST
-from fastapi_limiter import FastAPILimiter
+from app.settings import BASE_URL_PREFIX, APP_HOST, APP_PORT, REDIS_PORT, REDIS_HOST, MAIL_QUEUE_BACKEND, AVATAR_STORAGE, AVATAR_LOCAL_PATH, AVATAR_LOCAL_URL
+from app.limiter import limiter
+from app.cache import RedisCache
+from users.sweeper import token_sweeper
+from contacts.sweeper import tombstone_sweeper
+from app.mail import mail_queue, template_registry
+from app.mail.worker import create_worker
+from app.metrics import MetricsMiddleware, Gauge, registry
+from app.db import async_engine
+from app.replicas import ReadYourWritesMiddleware
+from users.cache import user_cache
+from contacts.cache import contact_list_cache
+from contacts.digest import birthday_digest
+from users.auth import auth
 import redis.asyncio as redis
 import uvicorn
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     r = await redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, encoding='utf-8', decode_responses=True)
-    await FastAPILimiter.init(r)
+    await RedisCache.init(r)
+    limiter.start()
+    token_sweeper.start()
+    tombstone_sweeper.start()
+    template_registry.load()
+    birthday_digest.start()
+    # a redis queue is drained by separate `python -m app.mail.worker` processes
+    mail_worker = create_worker(mail_queue) if MAIL_QUEUE_BACKEND == "memory" else None
+    if mail_worker:
+        mail_worker.start()
     yield
+    if mail_worker:
+        await mail_worker.stop()
+    await birthday_digest.stop()
+    await tombstone_sweeper.stop()
+    await token_sweeper.stop()
+    await limiter.stop()
+    await RedisCache.close()
 
 origins = [ "http://localhost:3000" ]
 
@@ -26,13 +56,34 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+registry.register(Gauge("db_pool_connections", "Connections of the async engine pool by state.", lambda: {
+    ("checked_out",): async_engine.pool.checkedout(),
+    ("checked_in",): async_engine.pool.checkedin(),
+    ("overflow",): max(async_engine.pool.overflow(), 0),
+}, ("state",)))
+registry.register(Gauge("db_pool_size", "Configured size of the async engine pool.", lambda: {(): async_engine.pool.size()}))
+registry.register(Gauge("user_cache", "User cache lookups and entries.", lambda: {(key,): value for key, value in user_cache.stats().items()}, ("stat",)))
+registry.register(Gauge("contact_list_cache", "Contact list page cache lookups and entries.", lambda: {(key,): value for key, value in contact_list_cache.stats().items()}, ("stat",)))
+registry.register(Gauge("birthday_digest", "Upcoming birthday digest reads.", lambda: {(key,): value for key, value in birthday_digest.stats().items()}, ("stat",)))
+registry.register(Gauge("password_hashing", "Password hashing worker pool.", lambda: {(key,): value for key, value in auth.password.stats().items()}, ("stat",)))
+
 routers = [auth_router, user_router, contacts_router]
 
 [app.include_router(router, prefix=BASE_URL_PREFIX) for router in routers]
 
+if AVATAR_STORAGE == "local":
+    app.mount(AVATAR_LOCAL_URL, StaticFiles(directory=AVATAR_LOCAL_PATH, check_dir=False), name="avatars")
+
 @app.get('/')
 def read_root() -> None:
     return {"message": "Contact app!"}
+
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.expose(), media_type="text/plain; version=0.0.4")
     
     
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Tuple
+import bisect
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = Lock()
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # per label values: counts per bucket (the last one is +Inf), sum
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self.lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self.lock:
+            counts, total = self.values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels((*self.labels, 'le'), (*labels, bound))} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {total[0]}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}"
+
+class Gauge:
+    """
+    Gauge read when the metrics are scraped, ``collect`` returns the value per label values.
+    """
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[Tuple[str, ...], float]], labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.expose()) + "\n"
+
+@dataclass
+class RequestTimings:
+    sql_count: int = 0
+    sql_seconds: float = 0
+    pool_wait_seconds: float = 0
+
+# timings of the request being handled, the engine hooks add to it
+request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+registry = Registry()
+http_requests = registry.register(Counter("http_requests_total", "HTTP requests by route, method and status. Rate limiter rejections have status 429.", ("route", "method", "status")))
+http_request_duration = registry.register(Histogram("http_request_duration_seconds", "HTTP request duration until the response started.", ("route", "method")))
+http_request_sql_statements = registry.register(Histogram("http_request_sql_statements", "SQL statements executed per HTTP request.", ("route", "method"), buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100)))
+sql_duration = registry.register(Histogram("sql_statement_duration_seconds", "SQL statement execution time."))
+pool_checkout_wait = registry.register(Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a database connection from the pool."))
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool that records how long a checkout waited for a connection,
+    which grows when the pool is saturated.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - started
+            pool_checkout_wait.observe(elapsed)
+            timings = request_timings.get()
+            if timings is not None:
+                timings.pool_wait_seconds += elapsed
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Records the number and duration of the statements executed by the engine,
+    per request when they are executed while handling one.
+    """
+
+    # kept on the execution context, which is discarded with a statement that fails
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        sql_duration.observe(elapsed)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.sql_count += 1
+            timings.sql_seconds += elapsed
+
+class MetricsMiddleware:
+    """
+    Records request metrics per route template and adds a ``Server-Timing`` header
+    with the time spent in the application, in SQL and waiting for the connection pool.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        started = time.perf_counter()
+        status, elapsed = 500, None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                server_timing = (
+                    f'app;dur={elapsed * 1000:.1f}, '
+                    f'db;dur={timings.sql_seconds * 1000:.1f};desc="{timings.sql_count} queries", '
+                    f'pool;dur={timings.pool_wait_seconds * 1000:.1f}'
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = self.__route(scope)
+            if elapsed is None:
+                elapsed = time.perf_counter() - started
+            http_request_duration.observe(elapsed, route, scope["method"])
+            http_requests.inc(route, scope["method"], str(status))
+            http_request_sql_statements.observe(timings.sql_count, route, scope["method"])
+            request_timings.reset(token)
+
+    def __route(self, scope: Scope) -> str:
+        # the template keeps the label cardinality bounded, unlike the raw path
+        route = scope.get("route")
+        return route.path if route is not None else "<unmatched>"
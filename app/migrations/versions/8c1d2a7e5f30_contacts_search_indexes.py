@@ -0,0 +1,44 @@
+"""contacts search indexes
+
+Revision ID: 8c1d2a7e5f30
+Revises: 384e33ef79d6
+Create Date: 2026-10-18 11:02:13.540127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1d2a7e5f30'
+down_revision: Union[str, None] = '384e33ef79d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('first_name', 'last_name', 'email')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f'ix_contacts_user_id_lower_{column}',
+            'contacts',
+            ['user_id', sa.text(f'lower({column}) text_pattern_ops')],
+            unique=False
+        )
+        op.create_index(
+            f'ix_contacts_lower_{column}_trgm',
+            'contacts',
+            [sa.text(f'lower({column}) gin_trgm_ops')],
+            unique=False,
+            postgresql_using='gin'
+        )
+
+
+def downgrade() -> None:
+    for column in reversed(SEARCH_COLUMNS):
+        op.drop_index(f'ix_contacts_lower_{column}_trgm', table_name='contacts')
+        op.drop_index(f'ix_contacts_user_id_lower_{column}', table_name='contacts')
@@ -0,0 +1,74 @@
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db import get_async_db, get_async_sessionmaker, ReplicaSessionLocals
+from app.settings import DB_REPLICA_STICKY_SECONDS
+from typing import AsyncIterator, List
+import itertools
+import math
+import time
+
+class ReplicaRouter:
+    """
+    Dependency providing the session of read-only routes: a replica chosen round robin,
+    or the primary when there are no replicas or the client wrote recently. After a write
+    :class:`ReadYourWritesMiddleware` sets a cookie that keeps the reads of the client on
+    the primary for ``sticky_seconds``, longer than the replicas are expected to lag.
+    """
+
+    def __init__(self, sessionmakers: List[async_sessionmaker[AsyncSession]], sticky_seconds: float, cookie: str = "read_primary_until") -> None:
+        self.sessionmakers = sessionmakers
+        self.sticky_seconds = sticky_seconds
+        self.cookie = cookie
+        self.__next = itertools.count()
+
+    def is_sticky(self, request: Request) -> bool:
+        try:
+            return float(request.cookies.get(self.cookie, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def choose(self, request: Request) -> async_sessionmaker[AsyncSession] | None:
+        """ The sessionmaker of the next replica, or None when the request reads from the primary """
+        if not self.sessionmakers or self.is_sticky(request):
+            return None
+        return self.sessionmakers[next(self.__next) % len(self.sessionmakers)]
+
+    async def __call__(self, request: Request, db: AsyncSession = Depends(get_async_db)) -> AsyncIterator[AsyncSession]:
+        # the primary session does not connect unless it is used
+        sessionmaker = self.choose(request)
+        if sessionmaker is None:
+            yield db
+            return
+        async with sessionmaker() as replica:
+            yield replica
+
+    def sessionmaker(self, request: Request, primary: async_sessionmaker[AsyncSession] = Depends(get_async_sessionmaker)) -> async_sessionmaker[AsyncSession]:
+        """ Dependency providing a sessionmaker instead of a session, for responses that read after the endpoint returned """
+        return self.choose(request) or primary
+
+read_router = ReplicaRouter(ReplicaSessionLocals, sticky_seconds=DB_REPLICA_STICKY_SECONDS)
+get_read_db = read_router
+get_read_sessionmaker = read_router.sessionmaker
+
+class ReadYourWritesMiddleware:
+    """ Sets the cookie of :class:`ReplicaRouter` on the successful responses to writes """
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app: ASGIApp, router: ReplicaRouter = read_router) -> None:
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in self.safe_methods:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400 and self.router.sessionmakers:
+                until = math.ceil(time.time() + self.router.sticky_seconds)
+                cookie = f"{self.router.cookie}={until}; Max-Age={math.ceil(self.router.sticky_seconds)}; Path=/; HttpOnly; SameSite=lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -1,9 +1,114 @@
-from contacts.seeds import main as contacts_seeds
-from users.seeds import main as user_seeds
+"""
+Seeds the database with generated users and contacts:
+
+    python -m app.seeds --users 50000 --contacts 1000000 --workers 8
+
+Rows are generated in a process pool and streamed into Postgres with COPY (plain
+inserts on other databases). Every seeded user is confirmed and has the same
+``--password``; the emails and the password are written to ``--csv``.
+"""
+from concurrent.futures import ProcessPoolExecutor, Future
+from sqlalchemy import Connection, Engine, Table, select, func, text
+from app.db import engine as default_engine
+from users.auth import auth
+from users.models import User
+from contacts.models import Contact
+from users import seeds as users_seeds
+from contacts import seeds as contacts_seeds
+from typing import Callable, Iterator
+import argparse
+import collections
+import csv
+import io
+import os
+import time
+
+def generate(executor: ProcessPoolExecutor, tasks: Iterator[tuple[Callable, tuple]], in_flight: int) -> Iterator[str]:
+    # keep a bounded number of chunks in flight so memory does not grow with the number of rows
+    pending: collections.deque[Future] = collections.deque()
+    for task, args in tasks:
+        pending.append(executor.submit(task, *args))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def copy(conn: Connection, table: Table, columns: tuple[str, ...], chunks: Iterator[str]) -> int:
+    rows = 0
+    if conn.dialect.name == "postgresql":
+        cursor = conn.connection.dbapi_connection.cursor()
+        for chunk in chunks:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", io.StringIO(chunk))
+            rows += cursor.rowcount
+        return rows
+    placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+    for chunk in chunks:
+        values = [tuple(value or None for value in row) for row in csv.reader(io.StringIO(chunk))]
+        conn.exec_driver_sql(statement, values)
+        rows += len(values)
+    return rows
+
+def chunked(total: int, batch_size: int) -> Iterator[tuple[int, int]]:
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+def report(name: str, rows: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    print(f"{name:>8}: {rows} rows in {elapsed:.1f}s, {rows / elapsed if elapsed else 0:.0f} rows/s")
+
+def seed(engine: Engine, users: int, contacts: int, workers: int, batch_size: int, password: str, random_seed: int = 0) -> tuple[int, int]:
+    """
+    Generates and loads users and contacts in a single transaction.
+
+    :return: The ids of the first and the last seeded user.
+    :rtype: tuple[int, int]
+    """
+    # synthetic users share one password, so it is hashed once instead of once per user
+    password_hash = auth.password.hash(password)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor, engine.begin() as conn:
+        first_id = (conn.scalar(select(func.max(User.id))) or 0) + 1
+        last_id = first_id + users - 1
+        loaded = copy(conn, User.__table__, users_seeds.COLUMNS, generate(executor, (
+            (users_seeds.generate_users, (first_id + start, count, password_hash, random_seed + start))
+            for start, count in chunked(users, batch_size)
+        ), workers * 2))
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"))
+        report("users", loaded, started)
+        if users == 0:
+            first_id, last_id = conn.execute(select(func.min(User.id), func.max(User.id))).one()
+        if contacts and first_id is None:
+            raise SystemExit("There are no users to seed contacts for")
+        contacts_started = time.perf_counter()
+        loaded = copy(conn, Contact.__table__, contacts_seeds.COLUMNS, generate(executor, (
+            (contacts_seeds.generate_contacts, (count, first_id, last_id, random_seed + start))
+            for start, count in chunked(contacts, batch_size)
+        ), workers * 2))
+        report("contacts", loaded, contacts_started)
+    report("total", users + contacts, started)
+    return first_id, last_id
+
+def write_credentials(engine: Engine, path: str, first_id: int, last_id: int, password: str) -> None:
+    with engine.connect() as conn, open(path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['email', 'password'])
+        emails = conn.execute(select(User.email).where(User.id.between(first_id, last_id)).execution_options(yield_per=10_000)).scalars()
+        writer.writerows((email, password) for email in emails)
 
 def main():
-    user_seeds()
-    contacts_seeds()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=10_000, help="rows generated and copied at once")
+    parser.add_argument("--password", default="password", help="password of every seeded user")
+    parser.add_argument("--csv", default="users.csv", help="file to write the emails and password of the seeded users to")
+    args = parser.parse_args()
+    first_id, last_id = seed(default_engine, args.users, args.contacts, args.workers, args.batch_size, args.password)
+    if args.users and args.csv:
+        write_credentials(default_engine, args.csv, first_id, last_id, args.password)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -14,6 +14,13 @@ SMTP_EMAIL=os.getenv("SMTP_EMAIL")
 SMTP_PASSWORD=os.getenv("SMTP_PASSWORD")
 SMTP_PORT=int(os.getenv("SMTP_PORT"))
 
+# MAIL QUEUE
+MAIL_QUEUE_BACKEND = os.getenv("MAIL_QUEUE_BACKEND", "redis") # redis | memory
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 4)) # open SMTP sessions, also the send concurrency
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BACKOFF = float(os.getenv("MAIL_RETRY_BACKOFF", 2)) # in seconds, doubled on every attempt
+
 # DATABASE SETTINGS
 DB_ENGINE = os.getenv('DB_ENGINE')
 DB_NAME = os.getenv('DB_NAME')
@@ -21,21 +28,57 @@ DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_HOST = os.getenv('DB_HOST')
 DB_PORT = int(os.getenv('DB_PORT', ''))
+DB_ASYNC_ENGINE = os.getenv('DB_ASYNC_ENGINE', 'postgresql+asyncpg')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+# comma separated async URLs of read replicas, read-only routes use them when set
+DB_REPLICA_URLS = [url.strip() for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url.strip()]
+DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 5)) # reads of a client stay on the primary after its writes
 
 DB_CONNECTION_STRING = f"{DB_ENGINE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+DB_ASYNC_CONNECTION_STRING = f"{DB_ASYNC_ENGINE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # URL
 BASE_URL_PREFIX = '/api'
 
 #REDIS
 REDIS_PORT = int(os.getenv('REDIS_PORT'))
-REDIS_HOST = 'localhost'
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+
+# RATE LIMITS
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "redis") # redis | memory
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1)) # in seconds, between counter syncs to redis
+
+# USER CACHE
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_LOCAL_TTL = float(os.getenv('USER_CACHE_LOCAL_TTL', 30)) # in seconds
+
+# CONTACT LIST CACHE
+CONTACTS_CACHE_SIZE = int(os.getenv('CONTACTS_CACHE_SIZE', 10000))
+CONTACTS_CACHE_TTL = float(os.getenv('CONTACTS_CACHE_TTL', 300)) # in seconds
+
+# CONTACT CHANGES
+CONTACTS_TOMBSTONE_TTL = int(os.getenv('CONTACTS_TOMBSTONE_TTL', 30)) # in days, older sync tokens require a full resync
+CONTACTS_TOMBSTONE_SWEEP_INTERVAL = int(os.getenv('CONTACTS_TOMBSTONE_SWEEP_INTERVAL', 3600)) # in seconds
+CONTACTS_TOMBSTONE_SWEEP_BATCH_SIZE = int(os.getenv('CONTACTS_TOMBSTONE_SWEEP_BATCH_SIZE', 1000))
+
+# BIRTHDAY DIGEST
+BIRTHDAY_DIGEST_DAYS = int(os.getenv('BIRTHDAY_DIGEST_DAYS', 7)) # the longest window served from the digest
+BIRTHDAY_DIGEST_HOUR = int(os.getenv('BIRTHDAY_DIGEST_HOUR', 3)) # local hour of the daily run
+BIRTHDAY_DIGEST_EMAIL = os.getenv('BIRTHDAY_DIGEST_EMAIL', 'false').lower() == 'true'
 
 #CLODUDINARY
 CLOUDINARY_NAME = os.getenv("CLOUDINARY_NAME")
 CLOUDINARY_KEY = os.getenv("CLOUDINARY_KEY")
 CLOUDINARY_SECRET = os.getenv("CLOUDINARY_SECRET")
 
+# AVATARS
+AVATAR_STORAGE = os.getenv("AVATAR_STORAGE", "cloudinary") # cloudinary | local
+AVATAR_LOCAL_PATH = os.getenv("AVATAR_LOCAL_PATH", "media/avatars")
+AVATAR_LOCAL_URL = os.getenv("AVATAR_LOCAL_URL", "/media/avatars")
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", 2))
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", 10 * 1024 * 1024))
+
 # TOKEN CONFIG
 @dataclass(frozen=True)
 class TokenConfig:
@@ -46,5 +89,15 @@ class TokenConfig:
     refresh_expired: int = 7 * 1440 # in days
     confirmation_email_expired: int = 7 * 1440 # in days
     url: str = '/api/auth/login'
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    password_workers: int = int(os.getenv("PASSWORD_WORKERS", 4))
+    sweep_interval: int = int(os.getenv("TOKEN_SWEEP_INTERVAL", 3600)) # in seconds
+    sweep_batch_size: int = int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", 1000))
+    max_sessions: int = int(os.getenv("MAX_SESSIONS", 10)) # refresh tokens kept per user, the oldest are revoked on login
+
+    def __post_init__(self) -> None:
+        # a login always keeps its own session
+        if self.max_sessions < 1:
+            raise ValueError(f"MAX_SESSIONS must be at least 1, got {self.max_sessions}")
 
 TOKEN_CONFIG = TokenConfig()
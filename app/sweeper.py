@@ -0,0 +1,70 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, delete
+from datetime import datetime
+from typing import Callable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BatchSweeper:
+    """
+    Periodically deletes the rows of ``model`` matched by :meth:`expired`. Subclasses set
+    ``model``, ``swept`` and implement :meth:`expired`.
+    """
+    model = None
+    # what is deleted, for the logs
+    swept = "rows"
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], interval: float, batch_size: int) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.task: asyncio.Task | None = None
+
+    def expired(self, now: datetime):
+        """ The condition of the rows to delete """
+        raise NotImplementedError
+
+    async def sweep(self, now: Callable[[], datetime] = datetime.utcnow) -> int:
+        """
+        Deletes the expired rows in batches, committing after every batch so that
+        locks are held briefly and concurrent writers are not blocked.
+
+        :param now: Returns the current UTC time.
+        :type now: Callable[[], datetime]
+        :return: The number of deleted rows.
+        :rtype: int
+        """
+        deleted = 0
+        async with self.session_factory() as db:
+            while True:
+                expired = select(self.model.id).where(self.expired(now())).limit(self.batch_size)
+                result = await db.execute(delete(self.model).where(self.model.id.in_(expired.scalar_subquery())))
+                await db.commit()
+                deleted += result.rowcount
+                if result.rowcount < self.batch_size:
+                    return deleted
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def __run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                deleted = await self.sweep()
+                logger.info("Deleted %s %s", deleted, self.swept)
+            except Exception:
+                logger.exception("Sweep of %s failed", self.swept)
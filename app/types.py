@@ -1,8 +1,13 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from fastapi import Depends
-from app.db import get_db
+from app.db import get_async_db
+from app.replicas import get_read_db, get_read_sessionmaker
 from users.auth import auth
 from typing import Annotated
 
 AuthDep = Annotated[auth, Depends(auth)]
-DBConnectionDep = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+DBConnectionDep = Annotated[AsyncSession, Depends(get_async_db)]
+# routes that only read, served by a replica when there is one
+ReadDBConnectionDep = Annotated[AsyncSession, Depends(get_read_db)]
+# streaming responses open their session when the body is sent, after the endpoint's dependencies are closed
+ReadSessionmakerDep = Annotated[async_sessionmaker[AsyncSession], Depends(get_read_sessionmaker)]
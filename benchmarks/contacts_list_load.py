@@ -0,0 +1,48 @@
+"""
+Load benchmark for GET /api/contacts.
+
+Fires ``--concurrency`` simultaneous requests against a running server for
+``--rounds`` rounds and prints latency percentiles. Run it once against the
+old build and once against the new one to compare p99 latency:
+
+    python -m benchmarks.contacts_list_load --url http://localhost:8000 --token <access token>
+"""
+from benchmarks.stats import percentile
+import argparse
+import asyncio
+import time
+import httpx
+
+async def fire(client: httpx.AsyncClient, path: str) -> float:
+    start = time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def run(url: str, token: str, concurrency: int, rounds: int, limit: int) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as client:
+        await fire(client, f"/api/contacts/?limit={limit}")
+        started = time.perf_counter()
+        for _ in range(rounds):
+            latencies += await asyncio.gather(*[fire(client, f"/api/contacts/?limit={limit}") for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    print(f"requests:   {len(latencies)}")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s")
+    for p in (50, 95, 99):
+        print(f"p{p}:        {percentile(latencies, p) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="access token of a seeded user")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.token, args.concurrency, args.rounds, args.limit))
+
+if __name__ == "__main__":
+    main()
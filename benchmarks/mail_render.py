@@ -0,0 +1,51 @@
+"""
+Messages rendered per second: fastapi-mail's per message template loading against
+the precompiled TemplateRegistry, synchronously and through ``render_async``:
+
+    python -m benchmarks.mail_render --messages 20000
+"""
+from app.mail.main import conf
+from app.mail.registry import TemplateRegistry
+from typing import Callable
+import argparse
+import asyncio
+import time
+
+def body(id: int) -> dict:
+    return {"username": f"user{id}", "host": "http://localhost:8000/", "token": f"token{id}"}
+
+def measure(name: str, messages: int, render: Callable[[int], object]) -> None:
+    started = time.perf_counter()
+    for id in range(messages):
+        render(id)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>24}: {messages / elapsed:10.0f} messages/s")
+
+async def measure_async(registry: TemplateRegistry, messages: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(id: int) -> None:
+        async with semaphore:
+            await registry.render_async("confirm_email.html", body(id))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(render(id) for id in range(messages)))
+    elapsed = time.perf_counter() - started
+    print(f"{'registry render_async':>24}: {messages / elapsed:10.0f} messages/s (concurrency {concurrency})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    # what FastMail.send_message does for every message
+    measure("fastapi-mail", args.messages, lambda id: conf.template_engine().get_template("confirm_email.html").render(**body(id)))
+    registry = TemplateRegistry(conf.TEMPLATE_FOLDER)
+    registry.load()
+    measure("registry html", args.messages, lambda id: registry.get("confirm_email.html").render(**body(id)))
+    measure("registry html + text", args.messages, lambda id: registry.render("confirm_email.html", body(id)))
+    asyncio.run(measure_async(registry, args.messages, args.concurrency))
+
+if __name__ == "__main__":
+    main()
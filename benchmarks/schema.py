@@ -0,0 +1,32 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateTable, CreateIndex
+from app.db import Base
+import users.models
+import contacts.models
+
+def create_schema(engine: Engine) -> bool:
+    """
+    Drops and recreates every table. On Postgres without the pg_trgm extension
+    the trigram indexes are skipped instead of failing the run. Also used by the
+    EXPLAIN tests, which need the same schema.
+
+    :return: Whether the trigram indexes were created.
+    """
+    has_trgm = True
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            try:
+                with conn.begin_nested():
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            except DBAPIError:
+                has_trgm = False
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            conn.execute(CreateTable(table))
+            for index in table.indexes:
+                if has_trgm or index.dialect_options["postgresql"]["using"] != "gin":
+                    conn.execute(CreateIndex(index))
+    return has_trgm
@@ -0,0 +1,59 @@
+from app.cache import LRUCache, RedisCache
+from app.settings import CONTACTS_CACHE_SIZE, CONTACTS_CACHE_TTL
+from redis.exceptions import RedisError
+
+class ContactListCache:
+    """
+    Serialized contact list pages keyed by the user, the collection version of the user
+    and the query. Any change to the contacts increments the version, so entries are never
+    invalidated: stale ones are simply not requested anymore and expire after ``ttl`` seconds.
+    The in-process tier is checked first, Redis shares the pages between workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, prefix: str = "contacts:list:") -> None:
+        self.local = LRUCache(maxsize)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> bytes | None:
+        body = self.local.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+        if RedisCache.redis is not None:
+            try:
+                raw = await RedisCache.redis.get(self.prefix + key)
+            except RedisError:
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                body = raw.encode() if isinstance(raw, str) else raw
+                self.local.set(key, body, self.ttl)
+                return body
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, body: bytes) -> None:
+        self.local.set(key, body, self.ttl)
+        if RedisCache.redis is not None:
+            try:
+                await RedisCache.redis.set(self.prefix + key, body, ex=max(int(self.ttl), 1))
+            except RedisError:
+                pass
+
+    async def clear(self) -> None:
+        self.local.clear()
+        if RedisCache.redis is not None:
+            try:
+                async for key in RedisCache.redis.scan_iter(match=self.prefix + "*", count=1000):
+                    await RedisCache.redis.delete(key)
+            except RedisError:
+                pass
+
+    def stats(self) -> dict:
+        return { "hits": self.hits, "redis_hits": self.redis_hits, "misses": self.misses, "size": len(self.local) }
+
+contact_list_cache = ContactListCache(maxsize=CONTACTS_CACHE_SIZE, ttl=CONTACTS_CACHE_TTL)
@@ -1,21 +1,44 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.db import has_date_next_days
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, select, insert, update, delete, tuple_, func, false, literal, null, union_all
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.db import upcoming_month_days, utcnow
+from app.pagination import encode_cursor, decode_cursor, InvalidCursor, ExpiredCursor
+from app.settings import CONTACTS_TOMBSTONE_TTL
 from users.models import User
-from contacts.models import Contact
+from contacts.models import Contact, ContactTombstone, SEARCH_COLUMNS
 from contacts import schemas
-from typing import List
+from pydantic import ValidationError
+from typing import List, Tuple, AsyncIterator, Iterator, BinaryIO, Callable
+from datetime import date, datetime, timedelta
+import asyncio
+import csv
+import io
+import itertools
+import json
+import re
+import time
 
 class ContactController:
     base_model = Contact
     user_model = User
+    tombstone_model = ContactTombstone
+    # tombstones are swept after it, see contacts.sweeper
+    tombstone_ttl = timedelta(days=CONTACTS_TOMBSTONE_TTL)
+    export_fields = ("id", "first_name", "last_name", "email", "phone", "birthday", "additional_data")
+    # the fields of ContactResponse
+    response_fields = ("id", "first_name", "last_name", "email", "phone", "birthday", "additional_data")
+    import_fields = ("first_name", "last_name", "email", "phone", "birthday", "additional_data")
+    max_reported_errors = 1000
 
-    async def list(self, q: str,  skip: int, limit: int, user: user_model, db: Session) -> List[base_model]:
+    async def list(self, q: str,  skip: int, limit: int, user: user_model, db: AsyncSession, match: str = "prefix", fields: Tuple[str, ...] | None = None) -> List[base_model]:
         """
         Retrieves a list of contacts for a specific user with specified pagination parameters.
 
         :param q: query string
         :type q: str
+        :param match: How ``q`` is matched against first name, last name and email: ``prefix`` (case-sensitive), ``iprefix`` or ``contains`` (both case-insensitive).
+        :type match: str
         :param skip: The number of notes to skip.
         :type skip: int
         :param limit: The maximum number of notes to return.
@@ -23,20 +46,63 @@ class ContactController:
         :param user: The user to retrieve notes for.
         :type user: User
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
+        :param fields: When given, rows of these columns are returned instead of contacts, without building ORM objects.
+        :type fields: Tuple[str, ...] | None
         :return: A list of contacts.
         :rtype: List[Contact]
         """
-        query = db.query(self.base_model).filter(self.base_model.user == user)
-        if q:
-            query = query.filter(or_(
-                self.base_model.first_name.like(f'{q}%'),
-                self.base_model.last_name.like(f'{q}%'),
-                self.base_model.email.like(f'{q}%'))
-            )
-        return query.offset(skip).limit(limit).all()
+        stmt = self.__search(self.__select(fields).where(self.base_model.user_id == user.id), q, match)
+        return await self.__fetch(stmt.offset(skip).limit(limit), fields, db)
+
+    async def page(self, q: str, cursor: str | None, limit: int, sort: str, user: user_model, db: AsyncSession, match: str = "prefix", fields: Tuple[str, ...] | None = None) -> Tuple[List[base_model], str | None]:
+        """
+        Retrieves a page of contacts for a specific user using keyset pagination.
+
+        :param q: query string
+        :type q: str
+        :param match: How ``q`` is matched, see :meth:`list`.
+        :type match: str
+        :param cursor: The ``next_cursor`` of the previous page, or None for the first page.
+        :type cursor: str | None
+        :param limit: The maximum number of contacts to return.
+        :type limit: int
+        :param sort: The column to sort by, one of ``id`` or ``first_name``.
+        :type sort: str
+        :param user: The user to retrieve contacts for.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :param fields: When given, rows of these columns are returned instead of contacts, see :meth:`list`. They must include ``id`` and ``sort``.
+        :type fields: Tuple[str, ...] | None
+        :return: A list of contacts and the cursor of the next page, or None if it is the last page.
+        :rtype: Tuple[List[Contact], str | None]
+        :raises InvalidCursor: If the cursor is malformed or was issued for another sort.
+        """
+        sort_column = self.base_model.id if sort == "id" else getattr(self.base_model, sort)
+        stmt = self.__search(self.__select(fields).where(self.base_model.user_id == user.id), q, match)
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            if len(values) != 3 or values[0] != sort:
+                raise InvalidCursor("Invalid cursor")
+            _, key, id = values
+            if not self.__is_int(id):
+                raise InvalidCursor("Invalid cursor")
+            key = self.__decode_key(sort_column, key)
+            if sort == "id":
+                stmt = stmt.where(self.base_model.id > id)
+            else:
+                stmt = stmt.where(tuple_(sort_column, self.base_model.id) > tuple_(key, id))
+        stmt = stmt.order_by(sort_column, self.base_model.id).limit(limit + 1)
+        contacts = await self.__fetch(stmt, fields, db)
+        next_cursor = None
+        if len(contacts) > limit:
+            contacts = contacts[:limit]
+            last = contacts[-1]
+            next_cursor = encode_cursor([sort, getattr(last, sort), last.id])
+        return contacts, next_cursor
 
-    async def create(self, user: user_model, body: schemas.ContactModel, db: Session) -> base_model:
+    async def create(self, user: user_model, body: schemas.ContactModel, db: AsyncSession) -> base_model:
         """
         Creates a new contact for a specific user.
 
@@ -45,17 +111,18 @@ class ContactController:
         :param user: The user to create the note for.
         :type user: User
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The newly created contact.
         :rtype: Contact
         """
-        contact = self.base_model(**body.model_dump(), user=user)
+        contact = self.base_model(**body.model_dump(), user_id=user.id)
         db.add(contact)
-        db.commit()
-        db.refresh(contact)
+        await self.__bump_collection_version(user, db)
+        await db.commit()
+        await db.refresh(contact)
         return contact
         
-    async def read(self, user: user_model, id: int, db: Session) -> base_model |  None:
+    async def read(self, user: user_model, id: int, db: AsyncSession) -> base_model |  None:
         """
         Retrieves a single contact with the specified ID for a specific user.
 
@@ -64,13 +131,41 @@ class ContactController:
         :param user: The user to retrieve the note for.
         :type user: User
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The contact with the specified ID, or None if it does not exist.
         :rtype: Contact | None
         """
-        return db.query(self.base_model).filter(self.base_model.id == id, self.base_model.user == user).first()
+        return await db.scalar(self.__select_one(user, id))
+
+    async def version(self, user: user_model, id: int, db: AsyncSession) -> int | None:
+        """
+        Retrieves the version of a single contact, enough to answer a conditional request.
+
+        :param id: The ID of the contact.
+        :type id: int
+        :param user: The owner of the contact.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The version of the contact, or None if it does not exist.
+        :rtype: int | None
+        """
+        return await db.scalar(select(self.base_model.version).where(self.base_model.id == id, self.base_model.user_id == user.id))
+
+    async def collection_version(self, user: user_model, db: AsyncSession) -> int:
+        """
+        Retrieves the version of the contacts of a user, incremented on every create, update and delete.
+
+        :param user: The user.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The version of the contacts.
+        :rtype: int
+        """
+        return await db.scalar(select(self.user_model.contacts_version).where(self.user_model.id == user.id)) or 0
     
-    async def update(self, user: user_model, id: int, body: schemas.ContactModel, db: Session) -> base_model | None:
+    async def update(self, user: user_model, id: int, body: schemas.ContactModel, db: AsyncSession) -> base_model | None:
         """
         Updates a single contact with the specified ID for a specific user.
 
@@ -81,18 +176,19 @@ class ContactController:
         :param user: The user to update the note for.
         :type user: User
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The updated contact, or None if it does not exist.
         :rtype: Contact | None
         """
-        contact = db.query(self.base_model).filter(self.base_model.id == id, self.base_model.user == user).first()
+        contact = await db.scalar(self.__select_one(user, id))
         if contact:
             for key, value in body.model_dump().items():
                 setattr(contact, key, value)
-            db.commit()
+            await self.__bump_collection_version(user, db)
+            await db.commit()
         return contact
     
-    async def delete(self, user: user_model, id: int, db: Session) -> base_model | None:
+    async def delete(self, user: user_model, id: int, db: AsyncSession) -> base_model | None:
         """
         Removes a single contact with the specified ID for a specific user.
 
@@ -101,15 +197,368 @@ class ContactController:
         :param user: The user to remove the note for.
         :type user: User
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The removed contact, or None if it does not exist.
         :rtype: Contact | None
         """
-        contact = db.query(self.base_model).filter(self.base_model.id == id, self.base_model.user == user).first()
+        contact = await db.scalar(self.__select_one(user, id))
         if contact:
-            db.delete(contact)
-            db.commit()
+            await db.delete(contact)
+            await self.__bump_collection_version(user, db)
+            await self.__add_tombstones(user, [contact.id], db)
+            await db.commit()
         return contact
     
-    async def upcoming_birthdays(self, user: user_model, db: Session, days: int = 7) -> List[base_model]:
-        return db.query(self.base_model).filter(has_date_next_days(self.base_model.birthday, days), self.base_model.user == user).all()
\ No newline at end of file
+    async def batch_update(self, user: user_model, selector: schemas.ContactBatchSelector, changes: dict, db: AsyncSession) -> Tuple[List[base_model], List[int]]:
+        """
+        Updates the selected contacts of a specific user with a single ``UPDATE ... RETURNING``.
+
+        :param user: The user to update contacts for.
+        :type user: User
+        :param selector: The ids or the search query of the contacts to update.
+        :type selector: ContactBatchSelector
+        :param changes: The new values by column.
+        :type changes: dict
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The updated contacts and the selected ids that do not exist.
+        :rtype: Tuple[List[Contact], List[int]]
+        """
+        # bulk updates do not maintain version_id_col, the ETags of the contacts depend on it
+        stmt = update(self.base_model).values(**changes, version=self.base_model.version + 1)
+        return await self.__batch(user, selector, stmt, db)
+
+    async def batch_delete(self, user: user_model, selector: schemas.ContactBatchSelector, db: AsyncSession) -> Tuple[List[base_model], List[int]]:
+        """
+        Removes the selected contacts of a specific user with a single ``DELETE ... RETURNING``.
+
+        :param user: The user to remove contacts for.
+        :type user: User
+        :param selector: The ids or the search query of the contacts to remove.
+        :type selector: ContactBatchSelector
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The removed contacts and the selected ids that do not exist.
+        :rtype: Tuple[List[Contact], List[int]]
+        """
+        return await self.__batch(user, selector, delete(self.base_model), db, tombstones=True)
+
+    async def changes(self, user: user_model, since: str | None, limit: int, db: AsyncSession, fields: Tuple[str, ...] = response_fields, now: Callable[[], datetime] = datetime.utcnow) -> Tuple[List[dict], List[int], str, bool]:
+        """
+        Retrieves the contacts of a specific user created, updated or deleted after a sync token,
+        oldest first, by a range scan of the ``(user_id, updated_at, id)`` indexes of contacts
+        and tombstones. A user's writes are serialized by :meth:`__bump_collection_version`
+        and stamped after it, so a change is never committed behind a token already issued.
+
+        :param user: The user to retrieve changes for.
+        :type user: User
+        :param since: The ``since`` of the previous response, or None to start with all contacts.
+        :type since: str | None
+        :param limit: The maximum number of changes to return.
+        :type limit: int
+        :param db: The database session.
+        :type db: AsyncSession
+        :param fields: The columns of the changed contacts, they must include ``id``.
+        :type fields: Tuple[str, ...]
+        :param now: Returns the current UTC time.
+        :type now: Callable[[], datetime]
+        :return: The changed contacts, the ids of the deleted contacts, the token to continue from and whether more changes follow.
+        :rtype: Tuple[List[dict], List[int], str, bool]
+        :raises InvalidCursor: If the token is malformed.
+        :raises ExpiredCursor: If deletions after the token may have been swept already.
+        """
+        columns = [getattr(self.base_model, field) for field in fields]
+        stmt = select(self.base_model.updated_at.label("changed_at"), *columns, literal(False).label("deleted")).where(self.base_model.user_id == user.id)
+        changed_at, id, synced_at = None, 0, None
+        if since is not None:
+            changed_at, id, synced_at = self.__decode_since(since, now)
+            if changed_at is not None:
+                stmt = stmt.where(tuple_(self.base_model.updated_at, self.base_model.id) > tuple_(changed_at, id))
+            # a client starting from scratch has no use for tombstones
+            tombstones = select(
+                self.tombstone_model.deleted_at,
+                *[self.tombstone_model.id if field == "id" else null() for field in fields],
+                literal(True)
+            ).where(self.tombstone_model.user_id == user.id)
+            if changed_at is not None:
+                tombstones = tombstones.where(tuple_(self.tombstone_model.deleted_at, self.tombstone_model.id) > tuple_(changed_at, id))
+            stmt = select(union_all(stmt, tombstones).subquery())
+        stmt = stmt.order_by(stmt.selected_columns.changed_at, stmt.selected_columns.id).limit(limit + 1)
+        rows = (await db.execute(stmt)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            changed_at, id = rows[-1].changed_at, rows[-1].id
+        # the client has every change up to synced_at, the sweeper may only drop tombstones before it
+        if not has_more:
+            synced_at = now()
+        elif synced_at is None or synced_at < changed_at:
+            synced_at = changed_at
+        since = encode_cursor(["changes", changed_at, id, synced_at])
+        items = [dict(zip(fields, row[1:-1])) for row in rows if not row.deleted]
+        deleted = [row.id for row in rows if row.deleted]
+        return items, deleted, since, has_more
+
+    async def upcoming_birthdays(self, user: user_model, db: AsyncSession, days: int = 7, skip: int = 0, limit: int = 100, today: date | None = None) -> List[base_model]:
+        """
+        Retrieves contacts of a specific user whose birthday falls within the next days, soonest first.
+
+        :param user: The user to retrieve contacts for.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :param days: The number of days to look ahead, starting tomorrow.
+        :type days: int
+        :param skip: The number of contacts to skip.
+        :type skip: int
+        :param limit: The maximum number of contacts to return.
+        :type limit: int
+        :param today: The date to count from, defaults to the current date.
+        :type today: date | None
+        :return: A list of contacts.
+        :rtype: List[Contact]
+        """
+        stmt = self.upcoming_birthdays_query(user, days, today or date.today())
+        contacts = await db.scalars(stmt.offset(skip).limit(limit))
+        return contacts.all()
+
+    async def export(self, user: user_model, db: AsyncSession, format: str = "ndjson", chunk_size: int = 1000) -> AsyncIterator[bytes]:
+        """
+        Streams all contacts of a specific user as NDJSON or CSV. Rows are read through a
+        server-side cursor in chunks, so memory use does not depend on the number of contacts.
+
+        :param user: The user to export contacts for.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :param format: ``ndjson`` or ``csv``.
+        :type format: str
+        :param chunk_size: The number of rows fetched per round trip.
+        :type chunk_size: int
+        :return: Chunks of the exported document.
+        :rtype: AsyncIterator[bytes]
+        """
+        columns = [getattr(self.base_model, field) for field in self.export_fields]
+        stmt = select(*columns).where(self.base_model.user_id == user.id).order_by(self.base_model.id)
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(self.export_fields)
+            async for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+            return
+        async for partition in result.partitions():
+            yield "".join(json.dumps(dict(zip(self.export_fields, row)), default=str) + "\n" for row in partition).encode()
+
+    async def bulk_create(self, user: user_model, file: BinaryIO, format: str, db: AsyncSession, chunk_size: int = 1000) -> schemas.BulkImportResponse:
+        """
+        Imports contacts for a specific user from an NDJSON or CSV file. Rows are validated in
+        chunks and valid rows are inserted in batches (``COPY`` on asyncpg, executemany otherwise)
+        within a single transaction. Invalid rows are skipped and reported.
+
+        :param user: The user to import contacts for.
+        :type user: User
+        :param file: The uploaded file.
+        :type file: BinaryIO
+        :param format: ``ndjson`` or ``csv``.
+        :type format: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :param chunk_size: The number of rows validated and inserted at once.
+        :type chunk_size: int
+        :return: The number of inserted and failed rows with errors of the first failed rows.
+        :rtype: BulkImportResponse
+        """
+        started = time.perf_counter()
+        # before the inserts, so they are stamped after the writes committed ahead of them
+        await self.__bump_collection_version(user, db)
+        rows = self.__read_rows(file, format)
+        inserted, failed, errors = 0, 0, []
+        while True:
+            # parsing and validation are CPU bound, keep them off the event loop
+            valid, invalid = await asyncio.to_thread(self.__validate_rows, itertools.islice(rows, chunk_size), user.id)
+            if not valid and not invalid:
+                break
+            failed += len(invalid)
+            errors += invalid[:self.max_reported_errors - len(errors)]
+            if valid:
+                await self.__insert_rows(valid, db)
+                inserted += len(valid)
+        if inserted:
+            await db.commit()
+        else:
+            await db.rollback()
+        elapsed = time.perf_counter() - started
+        return schemas.BulkImportResponse(
+            inserted=inserted,
+            failed=failed,
+            errors=errors,
+            elapsed=elapsed,
+            rows_per_second=(inserted + failed) / elapsed if elapsed else 0
+        )
+
+    def upcoming_birthdays_query(self, user: user_model, days: int, today: date):
+        """
+        Builds the range query on the indexed ``birthday_mmdd`` column used by :meth:`upcoming_birthdays`.
+        """
+        ranges = upcoming_month_days(today, days)
+        if not ranges:
+            return select(self.base_model).where(false())
+        column = self.base_model.birthday_mmdd
+        stmt = select(self.base_model).where(
+            self.base_model.user_id == user.id,
+            or_(*[column.between(lo, hi) for lo, hi in ranges])
+        )
+        # dates after the new year wrap to the end of the list
+        return stmt.order_by(column <= today.month * 100 + today.day, column, self.base_model.id)
+
+    def __select(self, fields: Tuple[str, ...] | None):
+        if fields is None:
+            return select(self.base_model)
+        return select(*[getattr(self.base_model, field) for field in fields])
+
+    async def __fetch(self, stmt, fields: Tuple[str, ...] | None, db: AsyncSession) -> list:
+        if fields is None:
+            return (await db.scalars(stmt)).all()
+        return (await db.execute(stmt)).all()
+
+    def __search(self, stmt, q: str, match: str = "prefix"):
+        if not q:
+            return stmt
+        escaped = re.sub(r"([\\%_])", r"\\\1", q)
+        clauses = []
+        for column in SEARCH_COLUMNS:
+            if match == "contains":
+                clauses.append(func.lower(column).like(f"%{escaped.lower()}%", escape="\\"))
+                continue
+            # lower(column) lets the (user_id, lower(column) text_pattern_ops) index narrow the scan
+            clause = func.lower(column).like(f"{escaped.lower()}%", escape="\\")
+            if match == "prefix":
+                clause = and_(clause, column.like(f"{escaped}%", escape="\\"))
+            clauses.append(clause)
+        return stmt.where(or_(*clauses))
+
+    def __read_rows(self, file: BinaryIO, format: str) -> Iterator[Tuple[int, dict | None]]:
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        if format == "csv":
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, { key: value or None for key, value in row.items() if key in self.import_fields }
+            return
+        number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+    def __validate_rows(self, chunk: Iterator[Tuple[int, dict | None]], user_id: int) -> Tuple[List[dict], List[schemas.BulkRowError]]:
+        valid, invalid = [], []
+        for number, row in chunk:
+            if row is None:
+                invalid.append(schemas.BulkRowError(row=number, errors=[{"type": "json_invalid", "msg": "Invalid JSON object"}]))
+                continue
+            try:
+                contact = schemas.ContactModel.model_validate(row)
+            except ValidationError as e:
+                invalid.append(schemas.BulkRowError(row=number, errors=e.errors(include_url=False, include_context=False)))
+                continue
+            valid.append({**contact.model_dump(), "user_id": user_id})
+        return valid, invalid
+
+    async def __insert_rows(self, rows: List[dict], db: AsyncSession) -> None:
+        connection = await db.connection()
+        if connection.dialect.driver == "asyncpg":
+            columns = list(rows[0].keys())
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                self.base_model.__tablename__,
+                records=[tuple(row[column] for column in columns) for row in rows],
+                columns=columns
+            )
+            return
+        await db.execute(insert(self.base_model), rows)
+
+    async def __add_tombstones(self, user: user_model, ids: List[int], db: AsyncSession) -> None:
+        # SQLite reuses the id of a deleted last row, a tombstone left from its previous contact is refreshed
+        connection = await db.connection()
+        dialect_insert = postgresql_insert if connection.dialect.name == "postgresql" else sqlite_insert
+        stmt = dialect_insert(self.tombstone_model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.tombstone_model.id],
+            set_={ "user_id": stmt.excluded.user_id, "deleted_at": utcnow() }
+        )
+        await db.execute(stmt, [{ "id": id, "user_id": user.id } for id in ids])
+
+    async def __batch(self, user: user_model, selector: schemas.ContactBatchSelector, stmt, db: AsyncSession, tombstones: bool = False) -> Tuple[List[base_model], List[int]]:
+        # before the statement, so the rows are stamped after the writes committed ahead of them
+        await self.__bump_collection_version(user, db)
+        stmt = stmt.where(self.base_model.user_id == user.id)
+        if selector.ids is not None:
+            stmt = stmt.where(self.base_model.id.in_(selector.ids))
+        else:
+            stmt = self.__search(stmt, selector.q, selector.match)
+        stmt = stmt.returning(self.base_model).execution_options(synchronize_session=False)
+        contacts = sorted((await db.scalars(stmt)).all(), key=lambda contact: contact.id)
+        if not contacts:
+            await db.rollback()
+        else:
+            if tombstones:
+                await self.__add_tombstones(user, [contact.id for contact in contacts], db)
+            await db.commit()
+        found = { contact.id for contact in contacts }
+        not_found = sorted(set(selector.ids) - found) if selector.ids is not None else []
+        return contacts, not_found
+
+    def __decode_since(self, since: str, now: Callable[[], datetime]) -> Tuple[datetime | None, int, datetime | None]:
+        # the keyset position (changed_at, id) and the time the client was last caught up
+        values = decode_cursor(since)
+        if len(values) != 4 or values[0] != "changes" or not self.__is_int(values[2]):
+            raise InvalidCursor("Invalid cursor")
+        _, changed_at, id, synced_at = values
+        try:
+            changed_at = datetime.fromisoformat(changed_at) if changed_at is not None else None
+            synced_at = datetime.fromisoformat(synced_at) if synced_at is not None else None
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor("Invalid cursor") from e
+        if synced_at is not None and synced_at < now() - self.tombstone_ttl:
+            raise ExpiredCursor("Expired cursor")
+        return changed_at, id, synced_at
+
+    def __decode_key(self, column, key):
+        # a cursor is client input, values of another type must not reach the driver
+        if key is None:
+            if column.nullable:
+                return key
+            raise InvalidCursor("Invalid cursor")
+        python_type = column.type.python_type
+        if python_type is int and self.__is_int(key) or python_type is str and isinstance(key, str):
+            return key
+        if python_type is date and isinstance(key, str):
+            try:
+                return date.fromisoformat(key)
+            except ValueError as e:
+                raise InvalidCursor("Invalid cursor") from e
+        raise InvalidCursor("Invalid cursor")
+
+    @staticmethod
+    def __is_int(value) -> bool:
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    async def __bump_collection_version(self, user: user_model, db: AsyncSession) -> None:
+        # in the transaction of the change, so cached pages are never served after a commit.
+        # It also locks the user row, serializing the writes of a user, see changes
+        stmt = update(self.user_model).where(self.user_model.id == user.id).values(contacts_version=self.user_model.contacts_version + 1)
+        await db.execute(stmt.execution_options(synchronize_session=False))
+
+    def __select_one(self, user: user_model, id: int):
+        return select(self.base_model).where(self.base_model.id == id, self.base_model.user_id == user.id)
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Daily digest of the upcoming birthdays of every user's contacts, computed in one pass
+over ``contacts`` and stored per user in Redis. Started with the app, or run once:
+
+    python -m contacts.digest --email
+"""
+from sqlalchemy import select, or_, and_, false
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from app.cache import RedisCache
+from app.db import AsyncSessionLocal, ReplicaSessionLocals, upcoming_month_days
+from app.mail.birthday_digest_email import BirthdayDigestEmail
+from app import settings
+from contacts.controllers import ContactController
+from contacts.models import Contact
+from users.models import User
+from datetime import date, datetime, timedelta
+from typing import List
+import argparse
+import asyncio
+import logging
+import orjson
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+def days_until(birthday: date, today: date) -> int:
+    """ Days from ``today`` to the next birthday, February 29 is celebrated on March 1 in non-leap years """
+    for year in (today.year, today.year + 1):
+        try:
+            next_birthday = birthday.replace(year=year)
+        except ValueError:
+            next_birthday = date(year, 3, 1)
+        if next_birthday > today:
+            return (next_birthday - today).days
+
+class BirthdayDigest:
+    """
+    Stores for every user the contacts whose birthday is within ``days`` days, ordered like
+    :meth:`ContactController.upcoming_birthdays`, together with the date it was computed for
+    and the collection version of the user. A digest is only served for that date and
+    version, so any contact write makes the route fall back to the live query.
+    """
+    contact_model = Contact
+    user_model = User
+    fields = ContactController.response_fields
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], days: int, hour: int, send_emails: bool = False, redis: Redis | None = None, prefix: str = "birthdays:digest:", batch_size: int = 1000) -> None:
+        self.session_factory = session_factory
+        self.days = days
+        self.hour = hour
+        self.send_emails = send_emails
+        self.__redis = redis
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.task: asyncio.Task | None = None
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    @property
+    def redis(self) -> Redis | None:
+        return self.__redis or RedisCache.redis
+
+    async def compute(self, today: date | None = None) -> int:
+        """
+        Computes and stores the digests of all users with a single query: users left joined
+        with their contacts whose ``birthday_mmdd`` falls in the window, streamed in user order.
+
+        :param today: The date to compute the digests for, defaults to the current date.
+        :type today: date | None
+        :return: The number of users the digest was stored for.
+        :rtype: int
+        """
+        today = today or date.today()
+        ranges = upcoming_month_days(today, self.days)
+        column = self.contact_model.birthday_mmdd
+        window = or_(*[column.between(lo, hi) for lo, hi in ranges]) if ranges else false()
+        stmt = (
+            select(
+                self.user_model.id, self.user_model.contacts_version, self.user_model.email, self.user_model.username, self.user_model.confirmed_at,
+                *[getattr(self.contact_model, field) for field in self.fields]
+            )
+            .outerjoin(self.contact_model, and_(self.contact_model.user_id == self.user_model.id, window))
+            .order_by(self.user_model.id, column <= today.month * 100 + today.day, column, self.contact_model.id)
+        )
+        users, batch, current = 0, [], None
+        async with self.session_factory() as db:
+            result = await db.stream(stmt.execution_options(yield_per=self.batch_size))
+            async for user_id, version, email, username, confirmed_at, *values in result:
+                if current is None or current["id"] != user_id:
+                    if current is not None:
+                        batch.append(current)
+                    if len(batch) >= self.batch_size:
+                        users += await self.__store(batch, today)
+                        batch = []
+                    current = { "id": user_id, "version": version, "email": email, "username": username, "confirmed": confirmed_at is not None, "contacts": [] }
+                if values[0] is not None:
+                    contact = dict(zip(self.fields, values))
+                    contact["birthday"] = contact["birthday"].isoformat()
+                    current["contacts"].append([days_until(values[self.fields.index("birthday")], today), contact])
+        if current is not None:
+            batch.append(current)
+        users += await self.__store(batch, today)
+        await self.redis.set(self.prefix + "date", today.isoformat())
+        return users
+
+    async def read(self, user_id: int, version: int, days: int, today: date | None = None) -> List[dict] | None:
+        """
+        Reads the upcoming birthdays of a user from the digest.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param version: The current collection version of the user.
+        :type version: int
+        :param days: The number of days to look ahead, starting tomorrow.
+        :type days: int
+        :param today: The date to count from, defaults to the current date.
+        :type today: date | None
+        :return: The contacts, or None if there is no current digest covering ``days``.
+        :rtype: List[dict] | None
+        """
+        today = today or date.today()
+        raw = None
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self.prefix + str(user_id))
+            except RedisError:
+                pass
+        if raw is None:
+            self.misses += 1
+            return None
+        digest = orjson.loads(raw)
+        if digest["date"] != today.isoformat() or digest["version"] != version or days > digest["days"]:
+            self.stale += 1
+            return None
+        self.hits += 1
+        return [contact for in_days, contact in digest["contacts"] if in_days <= days]
+
+    async def run_once(self, today: date | None = None) -> bool:
+        """ Computes the digests unless they are current or another process is computing them """
+        today = today or date.today()
+        if await self.redis.get(self.prefix + "date") == today.isoformat():
+            return False
+        lock = self.prefix + "lock:" + today.isoformat()
+        if not await self.redis.set(lock, 1, nx=True, ex=3600):
+            return False
+        try:
+            users = await self.compute(today)
+        except BaseException:
+            # lets the next run, here or in another process, retry
+            await self.redis.delete(lock)
+            raise
+        logger.info("Stored the birthday digests of %s users for %s", users, today)
+        return True
+
+    def stats(self) -> dict:
+        return { "hits": self.hits, "stale": self.stale, "misses": self.misses }
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def __store(self, users: List[dict], today: date) -> int:
+        if not users:
+            return 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user in users:
+                digest = { "date": today.isoformat(), "days": self.days, "version": user["version"], "contacts": user["contacts"] }
+                pipe.set(self.prefix + str(user["id"]), orjson.dumps(digest), ex=2 * 86400)
+            await pipe.execute()
+        if self.send_emails:
+            for user in users:
+                if user["contacts"] and user["confirmed"]:
+                    contacts = [{**contact, "in_days": in_days} for in_days, contact in user["contacts"]]
+                    await BirthdayDigestEmail(user["email"])(username=user["username"], days=self.days, contacts=contacts)
+        return len(users)
+
+    async def __run(self) -> None:
+        while True:
+            try:
+                # also catches up at startup when today's digest is missing
+                await self.run_once()
+            except (RedisError, OSError):
+                logger.warning("Birthday digest failed", exc_info=True)
+            except Exception:
+                logger.exception("Birthday digest failed")
+            now = datetime.now()
+            next_run = now.replace(hour=self.hour, minute=0, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+
+birthday_digest = BirthdayDigest(
+    # the pass only reads, a replica takes it off the primary
+    ReplicaSessionLocals[0] if ReplicaSessionLocals else AsyncSessionLocal,
+    days=settings.BIRTHDAY_DIGEST_DAYS,
+    hour=settings.BIRTHDAY_DIGEST_HOUR,
+    send_emails=settings.BIRTHDAY_DIGEST_EMAIL
+)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", type=date.fromisoformat, help="date to compute the digests for, today by default")
+    parser.add_argument("--email", action="store_true", help="also enqueue the digest emails")
+    args = parser.parse_args()
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0, encoding='utf-8', decode_responses=True)
+    await RedisCache.init(r)
+    birthday_digest.send_emails = birthday_digest.send_emails or args.email
+    try:
+        users = await birthday_digest.compute(args.date)
+        print(f"Stored the birthday digests of {users} users")
+    finally:
+        await RedisCache.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
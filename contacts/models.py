@@ -1,7 +1,7 @@
-from app.db import Base
-from sqlalchemy import Integer, String, Date, ForeignKey
+from app.db import Base, month_day, utcnow
+from sqlalchemy import Integer, SmallInteger, String, Date, DateTime, ForeignKey, Index, Computed, func, literal_column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import date
+from datetime import date, datetime
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -9,13 +9,55 @@ if TYPE_CHECKING:
 
 class Contact(Base):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_first_name_id', 'user_id', 'first_name', 'id'),
+        Index('ix_contacts_user_id_birthday_mmdd', 'user_id', 'birthday_mmdd'),
+        Index('ix_contacts_user_id_updated_at_id', 'user_id', 'updated_at', 'id'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     first_name: Mapped[str] = mapped_column(String(50), nullable=False) 
     last_name: Mapped[str] = mapped_column(String(100), nullable=True)
     email: Mapped[str] = mapped_column(String(50), nullable=True)
     phone: Mapped[str] = mapped_column(String(13), nullable=True)
     birthday: Mapped[date] = mapped_column(Date, nullable=True)
+    birthday_mmdd: Mapped[int] = mapped_column(SmallInteger, Computed(month_day(literal_column('birthday')), persisted=True), nullable=True)
     additional_data: Mapped[str] = mapped_column(String, nullable=True)
     user_id: Mapped[str] = mapped_column(Integer, ForeignKey("users.id"))
     user: Mapped["User"] = relationship(back_populates="contacts")
-    
\ No newline at end of file
+    # incremented by every ORM update, it is also the ETag of the contact
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+    # the position of the change in the feed of the changes route
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=utcnow(), onupdate=utcnow())
+
+    __mapper_args__ = {"version_id_col": version}
+
+class ContactTombstone(Base):
+    """ Records a deleted contact for the changes route until it is swept """
+    __tablename__ = 'contact_tombstones'
+    __table_args__ = (
+        Index('ix_contact_tombstones_user_id_deleted_at_id', 'user_id', 'deleted_at', 'id'),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=utcnow(), index=True)
+
+SEARCH_COLUMNS = (Contact.first_name, Contact.last_name, Contact.email)
+
+# prefix search: (user_id, lower(col) text_pattern_ops) serves LIKE 'q%' under any collation
+for column in SEARCH_COLUMNS:
+    Index(
+        f'ix_contacts_user_id_lower_{column.key}',
+        Contact.user_id,
+        func.lower(column).label(f'lower_{column.key}'),
+        postgresql_ops={f'lower_{column.key}': 'text_pattern_ops'}
+    )
+
+# infix search: pg_trgm GIN index serves LIKE '%q%'
+for column in SEARCH_COLUMNS:
+    Index(
+        f'ix_contacts_lower_{column.key}_trgm',
+        func.lower(column).label(f'lower_{column.key}'),
+        postgresql_using='gin',
+        postgresql_ops={f'lower_{column.key}': 'gin_trgm_ops'}
+    )
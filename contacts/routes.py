@@ -1,44 +1,122 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from app.types import DBConnectionDep, AuthDep
-from typing import Annotated, List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status, UploadFile, File
+from fastapi.responses import StreamingResponse
+from app.etag import make_etag, if_none_match
+from app.types import DBConnectionDep, ReadDBConnectionDep, AuthDep
+from typing import Annotated, List, Literal, Optional
+from app.pagination import InvalidCursor, ExpiredCursor
 from contacts.controllers import ContactController 
+from contacts.cache import contact_list_cache
+from contacts.digest import birthday_digest
 from contacts import schemas
-from fastapi_limiter.depends import RateLimiter
+from datetime import date
+import orjson
+from app.limiter import rate_limit, current_user
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 ContactControllerDep = Annotated[ContactController, Depends(ContactController)]
 
-@router.get('/', response_model=List[schemas.ContactResponse])
+NOT_MODIFIED = {304: {"description": "Not modified, the ETag in If-None-Match is current"}}
+
+@router.get('/', response_model=List[schemas.ContactResponse] | schemas.ContactPage, responses=NOT_MODIFIED)
 async def contacts_list(
+        request: Request,
         user: AuthDep,
         controller: ContactControllerDep,
-        db: DBConnectionDep, 
+        db: ReadDBConnectionDep, 
         q: str = '', 
+        match: Literal['prefix', 'iprefix', 'contains'] = 'prefix',
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        pagination: Literal['offset', 'cursor'] = 'offset',
+        cursor: Optional[str] = None,
+        sort: Literal['id', 'first_name'] = 'id'
     ):
-    return await controller.list(user=user, skip=skip, limit=limit, db=db, q=q)
+    # pages are cached by collection version, checking it is the only query of a cache hit
+    version = await controller.collection_version(user=user, db=db)
+    etag = make_etag(user.id, version, q, match, skip, limit, pagination, cursor, sort)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = await contact_list_cache.get(etag)
+    if body is None:
+        # plain rows of values validated on write, dumped without building models, see benchmarks/contacts_serialization.py
+        fields = controller.response_fields
+        if pagination == 'offset' and cursor is None:
+            rows = await controller.list(user=user, skip=skip, limit=limit, db=db, q=q, match=match, fields=fields)
+            body = orjson.dumps([row._asdict() for row in rows])
+        else:
+            try:
+                rows, next_cursor = await controller.page(user=user, cursor=cursor, limit=limit, sort=sort, db=db, q=q, match=match, fields=fields)
+            except InvalidCursor:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            body = orjson.dumps({"items": [row._asdict() for row in rows], "next_cursor": next_cursor})
+        await contact_list_cache.set(etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-@router.post('/', response_model=schemas.ContactResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=1, seconds=10))])
+@router.post('/', response_model=schemas.ContactResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit(times=1, seconds=10, identifier=current_user))])
 async def create_contact(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, body: schemas.ContactModel):
     return await controller.create(user=user, body=body, db=db)
 
+@router.post('/bulk', response_model=schemas.BulkImportResponse, dependencies=[Depends(rate_limit(times=1, seconds=60, identifier=current_user))])
+async def bulk_create_contacts(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, file: UploadFile = File(), format: Literal['ndjson', 'csv'] | None = None):
+    if format is None:
+        format = 'csv' if file.filename and file.filename.endswith('.csv') or file.content_type == 'text/csv' else 'ndjson'
+    return await controller.bulk_create(user=user, file=file.file, format=format, db=db)
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_contacts(user: AuthDep, controller: ContactControllerDep, db: ReadDBConnectionDep, format: Literal['ndjson', 'csv'] = 'ndjson'):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="contacts.{format}"'}
+    return StreamingResponse(controller.export(user=user, db=db, format=format), media_type=media_type, headers=headers)
+
+@router.patch('/batch', response_model=schemas.ContactBatchResponse, dependencies=[Depends(rate_limit(times=10, seconds=60, identifier=current_user))])
+async def batch_update_contacts(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, body: schemas.ContactBatchUpdate):
+    items, not_found = await controller.batch_update(user=user, selector=body, changes=body.changes.model_dump(exclude_unset=True), db=db)
+    return schemas.ContactBatchResponse(items=items, not_found=not_found)
+
+@router.delete('/batch', response_model=schemas.ContactBatchResponse, dependencies=[Depends(rate_limit(times=10, seconds=60, identifier=current_user))])
+async def batch_delete_contacts(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, body: schemas.ContactBatchSelector):
+    items, not_found = await controller.batch_delete(user=user, selector=body, db=db)
+    return schemas.ContactBatchResponse(items=items, not_found=not_found)
+
 @router.get('/upcoming_birthdays', response_model=List[schemas.ContactResponse])
-async def get_upcoming_birthdays(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, days: int = 7):
-    return await controller.upcoming_birthdays(user=user, db=db, days=days)
+async def get_upcoming_birthdays(user: AuthDep, controller: ContactControllerDep, db: ReadDBConnectionDep, days: int = 7, skip: int = 0, limit: int = 100):
+    # the daily digest is current until the next write to the collection
+    version = await controller.collection_version(user=user, db=db)
+    contacts = await birthday_digest.read(user.id, version, days, date.today())
+    if contacts is not None:
+        return Response(content=orjson.dumps(contacts[skip:skip + limit]), media_type="application/json")
+    return await controller.upcoming_birthdays(user=user, db=db, days=days, skip=skip, limit=limit)
+
+@router.get('/changes', response_model=schemas.ContactChanges, responses={410: {"description": "The token is too old, start over without since"}})
+async def contacts_changes(user: AuthDep, controller: ContactControllerDep, db: ReadDBConnectionDep, since: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000)):
+    try:
+        items, deleted, since, has_more = await controller.changes(user=user, since=since, limit=limit, db=db)
+    except ExpiredCursor:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Sync token expired")
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token")
+    body = orjson.dumps({"items": items, "deleted": deleted, "since": since, "has_more": has_more})
+    return Response(content=body, media_type="application/json")
 
-@router.get('/{contact_id}', response_model=schemas.ContactResponse)
-async def read_contact(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, contact_id: int):
+@router.get('/{contact_id}', response_model=schemas.ContactResponse, responses=NOT_MODIFIED)
+async def read_contact(request: Request, response: Response, user: AuthDep, controller: ContactControllerDep, db: ReadDBConnectionDep, contact_id: int):
+    if "if-none-match" in request.headers:
+        version = await controller.version(user=user, id=contact_id, db=db)
+        if version is not None and if_none_match(request, make_etag(contact_id, version)):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": make_etag(contact_id, version)})
     contact = await controller.read(user=user, id=contact_id, db=db)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    response.headers["ETag"] = make_etag(contact.id, contact.version)
     return contact
 
-@router.put('/{contact_id}', response_model=schemas.ContactResponse, dependencies=[Depends(RateLimiter(times=1, seconds=10))])
-async def update_contact(user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, body: schemas.ContactModel, contact_id: int):
+@router.put('/{contact_id}', response_model=schemas.ContactResponse, dependencies=[Depends(rate_limit(times=1, seconds=10, identifier=current_user))])
+async def update_contact(response: Response, user: AuthDep, controller: ContactControllerDep, db: DBConnectionDep, body: schemas.ContactModel, contact_id: int):
     contact = await controller.update(user=user, id=contact_id, body=body, db=db)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    response.headers["ETag"] = make_etag(contact.id, contact.version)
     return contact
 
 @router.delete('/{contact_id}', response_model=schemas.ContactResponse)
@@ -1,7 +1,7 @@
-from pydantic import Field, BaseModel, EmailStr
+from pydantic import Field, BaseModel, EmailStr, model_validator
 from pydantic_extra_types.phone_numbers import PhoneNumber
 from datetime import date
-from typing import Optional
+from typing import Literal, Optional, List
 
 PhoneNumber.phone_format = 'E164'
 
@@ -17,4 +17,61 @@ class ContactResponse(ContactModel):
     id: int
       
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ContactPatch(BaseModel):
+    first_name: Optional[str] = Field(None, max_length=50)
+    last_name: Optional[str] = Field(None, max_length=100)
+    email: Optional[EmailStr] = Field(None, max_length=50)
+    phone: Optional[PhoneNumber] = Field(None, max_length=13)
+    birthday: Optional[date] = None
+    additional_data: Optional[str] = Field(None, max_length=255)
+
+    @model_validator(mode="after")
+    def check_changes(self) -> "ContactPatch":
+        if not self.model_fields_set:
+            raise ValueError("At least one field must be changed")
+        if "first_name" in self.model_fields_set and self.first_name is None:
+            raise ValueError("first_name can not be removed")
+        return self
+
+class ContactBatchSelector(BaseModel):
+    """ Selects the contacts of a batch either by ``ids`` or by a search query like the list route """
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000)
+    q: Optional[str] = Field(None, min_length=1)
+    match: Literal['prefix', 'iprefix', 'contains'] = 'prefix'
+
+    @model_validator(mode="after")
+    def check_selector(self) -> "ContactBatchSelector":
+        if (self.ids is None) == (self.q is None):
+            raise ValueError("Either ids or q is required")
+        return self
+
+class ContactBatchUpdate(ContactBatchSelector):
+    changes: ContactPatch
+
+class ContactBatchResponse(BaseModel):
+    items: List[ContactResponse]
+    not_found: List[int] = []
+
+class ContactPage(BaseModel):
+    items: List[ContactResponse]
+    next_cursor: Optional[str] = None
+
+class ContactChanges(BaseModel):
+    """ Contacts created or updated and ids of contacts deleted after ``since``, oldest first """
+    items: List[ContactResponse]
+    deleted: List[int] = []
+    since: str
+    has_more: bool = False
+
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[dict]
+
+class BulkImportResponse(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+    elapsed: float
+    rows_per_second: float
@@ -0,0 +1,19 @@
+from app.db import AsyncSessionLocal
+from app.settings import CONTACTS_TOMBSTONE_SWEEP_INTERVAL, CONTACTS_TOMBSTONE_SWEEP_BATCH_SIZE
+from app.sweeper import BatchSweeper
+from contacts.controllers import ContactController
+from contacts.models import ContactTombstone
+from datetime import datetime
+
+class TombstoneSweeper(BatchSweeper):
+    """
+    Deletes the tombstones of contacts deleted longer than ``ContactController.tombstone_ttl`` ago.
+    The changes route answers sync tokens not caught up since then with 410 Gone.
+    """
+    model = ContactTombstone
+    swept = "contact tombstones"
+
+    def expired(self, now: datetime):
+        return self.model.deleted_at < now - ContactController.tombstone_ttl
+
+tombstone_sweeper = TombstoneSweeper(AsyncSessionLocal, interval=CONTACTS_TOMBSTONE_SWEEP_INTERVAL, batch_size=CONTACTS_TOMBSTONE_SWEEP_BATCH_SIZE)
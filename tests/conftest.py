@@ -1,17 +1,29 @@
+import os
+# rate limits are kept in the test process, see app.limiter
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
 import pytest
+from fastapi import Depends
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.db import Base, get_db
+from app.db import Base, get_async_db, get_async_sessionmaker
 from users.models import User
 from users.auth import auth
+from contacts.cache import contact_list_cache
+from app.limiter import limiter
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(scope="module")
 def session():
@@ -26,25 +38,27 @@ def session():
 
 @pytest.fixture(scope="module")
 def client(session: Session):
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
-    def override_auth():
-        user = session.query(User).filter(User.id == 1).first()
+    async def override_auth(db: AsyncSession = Depends(get_async_db)):
+        user = await db.scalar(select(User).where(User.id == 1))
         if user is None:
             user = User(username="Thanos", email="thanos@stones.five", password=auth.password.hash("123123123"))
-            session.add(user)
-            session.commit()
-            session.refresh(user)
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
         return user
 
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: TestingAsyncSessionLocal
     app.dependency_overrides[auth] = override_auth
 
     with TestClient(app) as client:
+        # every module starts with a new database, so collection versions start over
+        client.portal.call(contact_list_cache.clear)
+        limiter.buckets.clear()
         yield client
 
 @pytest.fixture(scope="module")
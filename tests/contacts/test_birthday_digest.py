@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta
+from app.limiter import limiter
+from app.mail.birthday_digest_email import BirthdayDigestEmail
+from app.mail.queue import MemoryMailQueue
+from contacts import routes
+from contacts.controllers import ContactController
+from contacts.digest import BirthdayDigest, days_until
+from contacts.models import Contact
+from users.models import User
+from tests.conftest import TestingAsyncSessionLocal
+
+fakeredis = pytest.importorskip("fakeredis")
+
+TOMORROW = date.today() + timedelta(days=1)
+
+BIRTHDAYS = {
+    "New Year": date(1990, 1, 1),
+    "Leap": date(2000, 2, 29),
+    "Mar 1": date(1970, 3, 1),
+    "Christmas": date(1995, 12, 25),
+    "Dec 31": date(1999, 12, 31),
+    # a leap year, tomorrow may be February 29
+    "Tomorrow": TOMORROW.replace(year=2000),
+}
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password="", avatar="https://example.com/avatar.jpg", confirmed_at=datetime.utcnow()))
+    session.add_all([Contact(first_name=name, birthday=birthday, user_id=1) for name, birthday in BIRTHDAYS.items()])
+    session.add(Contact(first_name="No birthday", user_id=1))
+    session.add(User(id=2, username="Gamora", email="gamora@stones.five", password=""))
+    session.add(Contact(first_name="Other user", birthday=date(1990, 12, 26), user_id=2))
+    session.add(User(id=3, username="Nebula", email="nebula@stones.five", password="", confirmed_at=datetime.utcnow()))
+    session.commit()
+
+@pytest.fixture
+def digest():
+    return BirthdayDigest(TestingAsyncSessionLocal, days=14, hour=3, redis=fakeredis.FakeAsyncRedis(decode_responses=True), batch_size=2)
+
+def live(today: date, days: int):
+    async def run():
+        async with TestingAsyncSessionLocal() as db:
+            return await ContactController().upcoming_birthdays(user=User(id=1), db=db, days=days, today=today)
+    return [contact.first_name for contact in asyncio.run(run())]
+
+def names(contacts):
+    return None if contacts is None else [contact["first_name"] for contact in contacts]
+
+def test_days_until():
+    assert days_until(date(1995, 12, 25), date(2023, 12, 24)) == 1
+    assert days_until(date(1995, 12, 25), date(2023, 12, 25)) == 366
+    assert days_until(date(2000, 2, 29), date(2023, 2, 28)) == 1
+    assert days_until(date(2000, 2, 29), date(2024, 2, 28)) == 1
+
+@pytest.mark.parametrize("today", [date(2023, 12, 20), date(2023, 2, 27), date(2024, 2, 27), date(2023, 6, 1)])
+def test_matches_live_query(digest, today):
+    assert asyncio.run(digest.compute(today)) == 3
+    for days in (1, 2, 7, 14):
+        assert names(asyncio.run(digest.read(1, 0, days, today))) == live(today, days)
+
+def test_stale_digest(digest):
+    today = date(2023, 12, 20)
+    asyncio.run(digest.compute(today))
+    assert names(asyncio.run(digest.read(2, 0, 14, today))) == ["Other user"]
+    assert asyncio.run(digest.read(3, 0, 14, today)) == []
+    assert asyncio.run(digest.read(1, 1, 14, today)) is None
+    assert asyncio.run(digest.read(1, 0, 14, today + timedelta(days=1))) is None
+    assert asyncio.run(digest.read(1, 0, 15, today)) is None
+    assert asyncio.run(digest.read(4, 0, 14, today)) is None
+    assert digest.stats() == {"hits": 2, "stale": 3, "misses": 1}
+
+def test_run_once(digest):
+    today = date(2023, 12, 20)
+    assert asyncio.run(digest.run_once(today)) is True
+    assert asyncio.run(digest.run_once(today)) is False
+    assert asyncio.run(digest.run_once(today + timedelta(days=1))) is True
+
+def test_emails(digest, monkeypatch):
+    queue = MemoryMailQueue()
+    monkeypatch.setattr(BirthdayDigestEmail, "queue", queue)
+    digest.send_emails = True
+    asyncio.run(digest.compute(date(2023, 12, 20)))
+    # Gamora is not confirmed and Nebula has no upcoming birthdays
+    assert queue.jobs.qsize() == 1
+    job = queue.jobs.get_nowait()
+    assert job.recipient == "thanos@stones.five"
+    assert [(contact["first_name"], contact["in_days"]) for contact in job.body["contacts"]] == [("Christmas", 5), ("Dec 31", 11), ("New Year", 12)]
+
+def test_route_reads_digest_until_write(client, digest, monkeypatch):
+    monkeypatch.setattr(routes, "birthday_digest", digest)
+    limiter.buckets.clear()
+    client.portal.call(digest.compute)
+    response = client.get("/api/contacts/upcoming_birthdays", params={"days": 1})
+    assert response.status_code == 200, response.text
+    assert [contact["first_name"] for contact in response.json()] == ["Tomorrow"]
+    assert response.json()[0]["birthday"] == BIRTHDAYS["Tomorrow"].isoformat()
+    assert digest.stats()["hits"] == 1
+
+    response = client.post("/api/contacts", json={"first_name": "Added", "birthday": TOMORROW.replace(year=2000).isoformat()})
+    assert response.status_code == 201, response.text
+    response = client.get("/api/contacts/upcoming_birthdays", params={"days": 1})
+    assert [contact["first_name"] for contact in response.json()] == ["Tomorrow", "Added"]
+    assert digest.stats()["stale"] == 1
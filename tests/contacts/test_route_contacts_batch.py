@@ -0,0 +1,63 @@
+import pytest
+from contacts.models import Contact
+from users.models import User
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    session.add_all([
+        User(id=1, username="Thanos", email="thanos@stones.five", password=""),
+        User(id=2, username="Loki", email="loki@asgard.com", password=""),
+    ])
+    session.add_all([
+        Contact(id=1, first_name="Tony", last_name="Stark", user_id=1),
+        Contact(id=2, first_name="Tony", last_name="Stark", user_id=1),
+        Contact(id=3, first_name="Bruce", last_name="Banner", user_id=1),
+        Contact(id=4, first_name="Thor", user_id=2),
+    ])
+    session.commit()
+
+def test_batch_update_ids(client):
+    etag = client.get("/api/contacts/1").headers["etag"]
+    response = client.patch("/api/contacts/batch", json={"ids": [1, 3, 4, 100], "changes": {"last_name": "Avenger", "birthday": "1970-05-29"}})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [(item["id"], item["first_name"], item["last_name"], item["birthday"]) for item in data["items"]] == [
+        (1, "Tony", "Avenger", "1970-05-29"),
+        (3, "Bruce", "Avenger", "1970-05-29"),
+    ]
+    # contact 4 belongs to another user
+    assert data["not_found"] == [4, 100]
+    assert client.get("/api/contacts/1", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/api/contacts/2").json()["last_name"] == "Stark"
+
+def test_batch_update_query(client):
+    response = client.patch("/api/contacts/batch", json={"q": "ton", "match": "iprefix", "changes": {"additional_data": "Iron"}})
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()["items"]] == [1, 2]
+    assert response.json()["not_found"] == []
+
+@pytest.mark.parametrize("body", [
+    {"changes": {"last_name": "Stark"}},
+    {"ids": [1], "q": "Tony", "changes": {"last_name": "Stark"}},
+    {"ids": [1], "changes": {}},
+    {"ids": [1], "changes": {"first_name": None}},
+    {"ids": [1], "changes": {"email": "not an email"}},
+])
+def test_batch_update_invalid(client, body):
+    assert client.patch("/api/contacts/batch", json=body).status_code == 422
+
+def test_batch_delete(client):
+    etag = client.get("/api/contacts").headers["etag"]
+    response = client.request("DELETE", "/api/contacts/batch", json={"ids": [2, 3, 4]})
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()["items"]] == [2, 3]
+    assert response.json()["not_found"] == [4]
+    response = client.get("/api/contacts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [1]
+
+def test_batch_delete_nothing(client):
+    etag = client.get("/api/contacts").headers["etag"]
+    response = client.request("DELETE", "/api/contacts/batch", json={"q": "Nobody"})
+    assert response.json() == {"items": [], "not_found": []}
+    assert client.get("/api/contacts", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,56 @@
+import json
+import pytest
+from app.main import app
+from users.models import User
+
+@pytest.fixture(scope="module", autouse=True)
+def user(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.commit()
+
+@pytest.fixture(scope="module", autouse=True)
+def no_rate_limit(client):
+    route = next(route for route in app.routes if getattr(route, "path", None) == "/api/contacts/bulk")
+    for dependency in route.dependencies:
+        app.dependency_overrides[dependency.dependency] = lambda: None
+    yield
+    for dependency in route.dependencies:
+        app.dependency_overrides.pop(dependency.dependency, None)
+
+def test_bulk_ndjson(client):
+    rows = [
+        {"first_name": "Tony", "last_name": "Stark", "phone": "+14155552671", "birthday": "1970-05-29"},
+        {"last_name": "Nameless"},
+        {"first_name": "Bruce", "email": "not an email"},
+        {"first_name": "Steve", "email": "cap@america.com"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n\nnot json\n"
+    response = client.post("/api/contacts/bulk", files={"file": ("contacts.ndjson", body, "application/x-ndjson")})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["inserted"] == 2
+    assert data["failed"] == 3
+    assert [error["row"] for error in data["errors"]] == [2, 3, 5]
+    assert data["errors"][0]["errors"][0]["loc"] == ["first_name"]
+    assert data["rows_per_second"] > 0
+    names = [contact["first_name"] for contact in client.get("/api/contacts").json()]
+    assert sorted(names) == ["Steve", "Tony"]
+
+def test_bulk_csv(client):
+    body = "first_name,last_name,email,phone,birthday,additional_data\nNatasha,Romanoff,,,1984-11-22,\nClint,,,bad phone,,\n"
+    response = client.post("/api/contacts/bulk", files={"file": ("contacts.csv", body, "text/csv")})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["inserted"] == 1
+    assert data["failed"] == 1
+    assert data["errors"][0]["row"] == 2
+    contact = client.get("/api/contacts", params={"q": "Natasha"}).json()[0]
+    assert contact["birthday"] == "1984-11-22"
+    assert contact["email"] is None
+
+def test_bulk_in_chunks(client):
+    body = "".join(json.dumps({"first_name": f"Clone {id}"}) + "\n" for id in range(2500))
+    response = client.post("/api/contacts/bulk", params={"format": "ndjson"}, files={"file": ("clones.txt", body)})
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2500
+    assert len(client.get("/api/contacts", params={"q": "Clone", "limit": 5000}).json()) == 2500
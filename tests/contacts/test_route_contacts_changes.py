@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from app.limiter import limiter
+from app.pagination import encode_cursor
+from contacts.controllers import ContactController
+from contacts.models import Contact, ContactTombstone
+from contacts.sweeper import TombstoneSweeper
+from users.models import User
+from tests.conftest import TestingAsyncSessionLocal
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    session.add_all([
+        User(id=1, username="Thanos", email="thanos@stones.five", password=""),
+        User(id=2, username="Loki", email="loki@asgard.com", password=""),
+    ])
+    session.add_all([Contact(id=id, first_name=f"Contact {id}", user_id=1) for id in range(1, 6)])
+    session.add(Contact(id=6, first_name="Thor", user_id=2))
+    session.commit()
+
+@pytest.fixture(autouse=True)
+def no_rate_limit():
+    limiter.buckets.clear()
+
+def changes(client, since=None, **params):
+    response = client.get("/api/contacts/changes", params={"since": since, **params} if since else params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def sync(client, since=None, limit=2):
+    items, deleted = [], []
+    while True:
+        data = changes(client, since, limit=limit)
+        items += [item["id"] for item in data["items"]]
+        deleted += data["deleted"]
+        since = data["since"]
+        if not data["has_more"]:
+            return items, deleted, since
+
+def test_initial_sync_pages(client):
+    items, deleted, since = sync(client)
+    assert sorted(items) == [1, 2, 3, 4, 5]
+    assert deleted == []
+    data = changes(client, since)
+    assert (data["items"], data["deleted"], data["has_more"]) == ([], [], False)
+
+def test_changes_since(client):
+    _, _, since = sync(client)
+    client.put("/api/contacts/2", json={"first_name": "Updated"})
+    client.delete("/api/contacts/3")
+    limiter.buckets.clear()
+    created = client.post("/api/contacts", json={"first_name": "Created"}).json()
+    data = changes(client, since)
+    assert [(item["id"], item["first_name"]) for item in data["items"]] == [(2, "Updated"), (created["id"], "Created")]
+    assert data["deleted"] == [3]
+    assert changes(client, data["since"])["items"] == []
+
+def test_batch_changes(client):
+    _, _, since = sync(client)
+    client.patch("/api/contacts/batch", json={"ids": [1, 4], "changes": {"last_name": "Avenger"}})
+    client.request("DELETE", "/api/contacts/batch", json={"ids": [5]})
+    items, deleted, since = sync(client, since, limit=1)
+    assert sorted(items) == [1, 4]
+    assert deleted == [5]
+    # a batch that matches nothing changes nothing
+    client.request("DELETE", "/api/contacts/batch", json={"ids": [100]})
+    assert changes(client, since)["deleted"] == []
+
+def test_initial_sync(client):
+    # the first page skips tombstones, later pages may list contacts the client never had
+    items, deleted, _ = sync(client, limit=100)
+    assert sorted(items) == [1, 2, 4, 7]
+    assert deleted == []
+
+def test_sync_from_empty_collection(client):
+    # the token issued to a client of a user without contacts
+    data = changes(client, encode_cursor(["changes", None, 0, None]), limit=100)
+    assert sorted(item["id"] for item in data["items"]) == [1, 2, 4, 7]
+    assert data["deleted"] == [3, 5]
+
+@pytest.mark.parametrize("since", [
+    "garbage",
+    encode_cursor(["id", 1, 1]),
+    encode_cursor(["changes", "yesterday", 1, None]),
+    encode_cursor(["changes", None, "1", None]),
+    encode_cursor(["changes", None, 0, "today"]),
+])
+def test_invalid_since(client, since):
+    assert client.get("/api/contacts/changes", params={"since": since}).status_code == 400
+
+def test_expired_since(client):
+    since = encode_cursor(["changes", None, 0, datetime.utcnow() - timedelta(days=365)])
+    assert client.get("/api/contacts/changes", params={"since": since}).status_code == 410
+
+def test_quiet_collection_does_not_expire(client):
+    # no writes for longer than the tombstones are kept
+    later = lambda: datetime.utcnow() + ContactController.tombstone_ttl + timedelta(days=1)
+
+    async def sync_later(since):
+        async with TestingAsyncSessionLocal() as db:
+            return await ContactController().changes(user=User(id=1), since=since, limit=100, db=db, now=later)
+    items, _, since, _ = asyncio.run(sync_later(None))
+    assert items
+    # the tombstones after the last contact, then nothing
+    _, _, since, _ = asyncio.run(sync_later(since))
+    assert asyncio.run(sync_later(since))[:2] == ([], [])
+    assert client.get("/api/contacts/changes", params={"since": since}).status_code == 200
+
+def test_sweep_tombstones(client):
+    sweeper = TombstoneSweeper(TestingAsyncSessionLocal, interval=3600, batch_size=1)
+    assert asyncio.run(sweeper.sweep()) == 0
+    assert asyncio.run(sweeper.sweep(now=lambda: datetime.utcnow() + timedelta(days=365))) == 2
+
+    async def count():
+        async with TestingAsyncSessionLocal() as db:
+            return len((await db.scalars(ContactTombstone.__table__.select())).all())
+    assert asyncio.run(count()) == 0
+
+def test_delete_reused_id_twice(client):
+    _, _, since = sync(client)
+    id = client.post("/api/contacts", json={"first_name": "Once"}).json()["id"]
+    assert client.delete(f"/api/contacts/{id}").status_code == 200
+    limiter.buckets.clear()
+    # SQLite gives the id of a deleted last row to the next one
+    assert client.post("/api/contacts", json={"first_name": "Twice"}).json()["id"] == id
+    response = client.delete(f"/api/contacts/{id}")
+    assert response.status_code == 200, response.text
+    _, deleted, _ = sync(client, since)
+    assert deleted == [id]
@@ -0,0 +1,71 @@
+import pytest
+from app.limiter import limiter
+from contacts.cache import contact_list_cache
+from contacts.models import Contact
+from contacts.schemas import ContactResponse
+from users.models import User
+
+@pytest.fixture(scope="module", autouse=True)
+def user(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.commit()
+
+@pytest.fixture(scope="module")
+def contact_id(client, contact):
+    response = client.post("/api/contacts/", json=contact)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_read_contact_not_modified(client, contact_id, updated_contact):
+    response = client.get(f"/api/contacts/{contact_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    response = client.get(f"/api/contacts/{contact_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    response = client.put(f"/api/contacts/{contact_id}", json=updated_contact)
+    assert response.status_code == 200, response.text
+    assert response.headers["etag"] != etag
+    response = client.get(f"/api/contacts/{contact_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Thor"
+    assert response.headers["etag"] == client.get(f"/api/contacts/{contact_id}").headers["etag"]
+
+def test_list_contacts_cached(client, contact_id):
+    response = client.get("/api/contacts/")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    hits = contact_list_cache.stats()["hits"]
+    cached = client.get("/api/contacts/")
+    assert cached.json() == response.json()
+    assert cached.headers["etag"] == etag
+    assert contact_list_cache.stats()["hits"] == hits + 1
+    assert client.get("/api/contacts/", headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+    # another query is another page
+    assert client.get("/api/contacts/", params={"limit": 1}).headers["etag"] != etag
+
+    response = client.delete(f"/api/contacts/{contact_id}")
+    assert response.status_code == 200
+    response = client.get("/api/contacts/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
+    assert response.headers["etag"] != etag
+
+def test_list_contacts_page(client):
+    response = client.get("/api/contacts/", params={"pagination": "cursor"})
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_cursor": None}
+    assert client.get("/api/contacts/", params={"pagination": "cursor"}, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get("/api/contacts/", params={"cursor": "broken"}).status_code == 400
+
+def test_list_matches_response_model(client, session):
+    limiter.buckets.clear()
+    response = client.post("/api/contacts/", json={"first_name": "Wanda", "last_name": "Maximoff", "email": "wanda@westview.com", "phone": "+14155552671", "birthday": "1989-02-10", "additional_data": "Scarlet"})
+    assert response.status_code == 201, response.text
+    # the list is dumped from plain rows, it must match what the response model produces
+    contact = session.get(Contact, response.json()["id"])
+    expected = ContactResponse.model_validate(contact).model_dump(mode="json")
+    assert client.get("/api/contacts/").json() == [expected]
+    assert client.get("/api/contacts/", params={"pagination": "cursor", "sort": "first_name"}).json() == {"items": [expected], "next_cursor": None}
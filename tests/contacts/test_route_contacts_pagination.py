@@ -0,0 +1,75 @@
+import pytest
+from app.pagination import encode_cursor
+from contacts.models import Contact
+from users.models import User
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    user = User(id=1, username="Thanos", email="thanos@stones.five", password="")
+    session.add(user)
+    session.add_all([Contact(first_name=name, user_id=1) for name in ["Dave", "Carol", "Bob", "Alice", "Carol"]])
+    session.add(User(id=2, username="Gamora", email="gamora@stones.five", password=""))
+    session.add(Contact(first_name="Eve", user_id=2))
+    session.commit()
+
+def fetch_all(client, **params):
+    pages, cursor = [], None
+    while True:
+        query = {"pagination": "cursor", "limit": 2, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/api/contacts", params=query)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        pages.append(data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_offset_pagination_is_default(client):
+    response = client.get("/api/contacts", params={"skip": 1, "limit": 2})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert type(data) == list
+    assert len(data) == 2
+
+def test_cursor_pagination_by_id(client):
+    pages = fetch_all(client)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    ids = [contact["id"] for page in pages for contact in page]
+    assert ids == [1, 2, 3, 4, 5]
+
+def test_cursor_pagination_by_first_name(client):
+    pages = fetch_all(client, sort="first_name")
+    contacts = [(contact["first_name"], contact["id"]) for page in pages for contact in page]
+    assert contacts == [("Alice", 4), ("Bob", 3), ("Carol", 2), ("Carol", 5), ("Dave", 1)]
+
+def test_cursor_pagination_with_query(client):
+    pages = fetch_all(client, q="Carol")
+    assert [contact["id"] for page in pages for contact in page] == [2, 5]
+
+def test_invalid_cursor(client):
+    response = client.get("/api/contacts", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_cursor_of_another_sort(client):
+    response = client.get("/api/contacts", params={"pagination": "cursor", "limit": 1})
+    cursor = response.json()["next_cursor"]
+    response = client.get("/api/contacts", params={"cursor": cursor, "sort": "first_name"})
+    assert response.status_code == 400, response.text
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("id", ["id", 1, "1"]),
+    ("id", ["id", 1, {"id": 1}]),
+    ("id", ["id", "1", 1]),
+    ("id", ["id", True, 1]),
+    ("first_name", ["first_name", 1, 1]),
+    ("first_name", ["first_name", None, 1]),
+    ("first_name", ["first_name", ["Bob"], 1]),
+    ("first_name", ["first_name", "Bob", 1.5]),
+])
+def test_cursor_of_wrong_types(client, sort, cursor):
+    response = client.get("/api/contacts", params={"pagination": "cursor", "cursor": encode_cursor(cursor), "sort": sort})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid cursor"
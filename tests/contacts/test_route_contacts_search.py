@@ -0,0 +1,44 @@
+import pytest
+from contacts.models import Contact
+from users.models import User
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.add_all([
+        Contact(first_name="Peter", last_name="Parker", email="spider@man.com", user_id=1),
+        Contact(first_name="Wanda", last_name="Maximoff", email="scarlet@witch.com", user_id=1),
+        Contact(first_name="Pietro", last_name="Maximoff", email="quick@silver.com", user_id=1),
+        Contact(first_name="Under_score", user_id=1),
+    ])
+    session.commit()
+
+def search(client, q, match=None):
+    params = {"q": q}
+    if match:
+        params["match"] = match
+    response = client.get("/api/contacts", params=params)
+    assert response.status_code == 200, response.text
+    return sorted(contact["first_name"] for contact in response.json())
+
+def test_prefix(client):
+    assert search(client, "P") == ["Peter", "Pietro"]
+    assert search(client, "Max") == ["Pietro", "Wanda"]
+
+def test_iprefix(client):
+    assert search(client, "max", "iprefix") == ["Pietro", "Wanda"]
+    assert search(client, "SCARLET", "iprefix") == ["Wanda"]
+
+def test_contains(client):
+    assert search(client, "ete", "contains") == ["Peter"]
+    assert search(client, "IMOF", "contains") == ["Pietro", "Wanda"]
+    assert search(client, "silver.com", "contains") == ["Pietro"]
+
+def test_wildcards_are_literal(client):
+    assert search(client, "%", "contains") == []
+    assert search(client, "e_e", "contains") == []
+    assert search(client, "r_s", "contains") == ["Under_score"]
+
+def test_invalid_match(client):
+    response = client.get("/api/contacts", params={"q": "P", "match": "regex"})
+    assert response.status_code == 422, response.text
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from datetime import date
+from app.db import upcoming_month_days
+from contacts.controllers import ContactController
+from contacts.models import Contact
+from users.models import User
+from tests.conftest import TestingAsyncSessionLocal
+
+BIRTHDAYS = {
+    "New Year": date(1990, 1, 1),
+    "Leap": date(2000, 2, 29),
+    "Feb 28": date(1985, 2, 28),
+    "Mar 1": date(1970, 3, 1),
+    "Mar 2": date(1970, 3, 2),
+    "Christmas": date(1995, 12, 25),
+    "Dec 31": date(1999, 12, 31),
+}
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.add_all([Contact(first_name=name, birthday=birthday, user_id=1) for name, birthday in BIRTHDAYS.items()])
+    session.add(Contact(first_name="No birthday", user_id=1))
+    session.add(User(id=2, username="Gamora", email="gamora@stones.five", password=""))
+    session.add(Contact(first_name="Other user", birthday=date(1990, 12, 26), user_id=2))
+    session.commit()
+
+def upcoming(today: date, days: int, **kwargs):
+    async def run():
+        async with TestingAsyncSessionLocal() as db:
+            return await ContactController().upcoming_birthdays(user=User(id=1), db=db, days=days, today=today, **kwargs)
+    return [contact.first_name for contact in asyncio.run(run())]
+
+def test_month_day_ranges():
+    assert upcoming_month_days(date(2023, 6, 1), 7) == [(602, 608)]
+    assert upcoming_month_days(date(2023, 12, 28), 7) == [(1229, 1231), (101, 104)]
+    assert upcoming_month_days(date(2023, 2, 27), 2) == [(228, 301)]
+    assert upcoming_month_days(date(2023, 2, 28), 1) == [(229, 301)]
+    assert upcoming_month_days(date(2024, 2, 28), 1) == [(229, 229)]
+    assert upcoming_month_days(date(2023, 6, 1), 0) == []
+    assert upcoming_month_days(date(2023, 6, 1), 400) == [(101, 1231)]
+
+def test_window_starts_tomorrow():
+    assert upcoming(date(2023, 12, 24), 1) == ["Christmas"]
+    assert upcoming(date(2023, 12, 25), 1) == []
+
+def test_year_wraparound():
+    assert upcoming(date(2023, 12, 20), 14) == ["Christmas", "Dec 31", "New Year"]
+
+def test_leap_day_in_non_leap_year():
+    assert upcoming(date(2023, 2, 27), 1) == ["Feb 28"]
+    assert upcoming(date(2023, 2, 28), 1) == ["Leap", "Mar 1"]
+
+def test_leap_day_in_leap_year():
+    assert upcoming(date(2024, 2, 28), 1) == ["Leap"]
+    assert upcoming(date(2024, 2, 29), 1) == ["Mar 1"]
+
+def test_skip_limit():
+    assert upcoming(date(2023, 12, 20), 14, skip=1, limit=1) == ["Dec 31"]
@@ -0,0 +1,132 @@
+import unittest
+import email
+import email.policy
+import socket
+import pytest
+from fastapi_mail import ConnectionConfig
+from app.mail.main import conf
+from app.mail.queue import MailJob, MemoryMailQueue, RedisMailQueue
+from app.mail.smtp import SMTPPool
+from app.mail.worker import MailWorker
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+class Handler:
+    def __init__(self) -> None:
+        self.messages = []
+        self.sessions = set()
+        self.replies = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        if self.replies:
+            return self.replies.pop(0)
+        self.messages.append(envelope)
+        return "250 OK"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def job(id: int) -> MailJob:
+    return MailJob(recipient=f"user{id}@mail.com", subject="Please confirm your email address", template="confirm_email.html", body={"username": f"user{id}", "host": "http://localhost/", "token": "token"})
+
+class TestMailWorker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.handler = Handler()
+        self.server = controller.Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.server.start()
+        self.config = ConnectionConfig(
+            MAIL_USERNAME="",
+            MAIL_PASSWORD="",
+            MAIL_FROM="app@example.com",
+            MAIL_PORT=self.server.port,
+            MAIL_SERVER="127.0.0.1",
+            MAIL_FROM_NAME="Contact app",
+            MAIL_STARTTLS=False,
+            MAIL_SSL_TLS=False,
+            USE_CREDENTIALS=False,
+            TEMPLATE_FOLDER=conf.TEMPLATE_FOLDER
+        )
+        self.queue = MemoryMailQueue()
+        self.worker = MailWorker(self.queue, SMTPPool(self.config, size=2), config=self.config, batch_size=50, max_attempts=3, backoff=0.01)
+
+    async def asyncTearDown(self) -> None:
+        await self.worker.stop()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    async def test_batch_over_pooled_connections(self):
+        for id in range(20):
+            await self.queue.put(job(id))
+        self.assertEqual(await self.worker.process_batch(timeout=0.1), 20)
+        self.assertEqual(len(self.handler.messages), 20)
+        self.assertEqual(len(self.handler.sessions), 2)
+        self.assertEqual(self.handler.messages[0].mail_from, "app@example.com")
+        message = email.message_from_bytes(self.handler.messages[0].content, policy=email.policy.default)
+        self.assertEqual(message["Subject"], "Please confirm your email address")
+        self.assertIn('href="http://localhost/api/auth/confirmed_email/token"', message.get_body(("html",)).get_content())
+        self.assertIn("Verification (http://localhost/api/auth/confirmed_email/token)", message.get_body(("plain",)).get_content())
+        for id in range(20, 25):
+            await self.queue.put(job(id))
+        await self.worker.process_batch(timeout=0.1)
+        # the sessions stay open between batches
+        self.assertEqual(len(self.handler.sessions), 2)
+        self.assertEqual(self.worker.stats(), {"sent": 25, "retried": 0, "failed": 0})
+
+    async def test_retry_temporary_failure(self):
+        self.handler.replies = ["451 Try again later"]
+        await self.queue.put(job(1))
+        await self.worker.process_batch(timeout=0.1)
+        self.assertEqual(await self.queue.size(), 1)
+        self.assertEqual(await self.worker.process_batch(timeout=1), 1)
+        self.assertEqual(len(self.handler.messages), 1)
+        self.assertEqual(self.worker.stats(), {"sent": 1, "retried": 1, "failed": 0})
+
+    async def test_permanent_failure(self):
+        self.handler.replies = ["554 Rejected"]
+        await self.queue.put(job(1))
+        await self.worker.process_batch(timeout=0.1)
+        self.assertEqual(await self.queue.size(), 0)
+        self.assertEqual([job.id for job in self.queue.dead_jobs], [self.queue.dead_jobs[0].id])
+        self.assertEqual(self.worker.stats()["failed"], 1)
+
+    async def test_gives_up_after_max_attempts(self):
+        self.handler.replies = ["451 Try again later"] * 3
+        await self.queue.put(job(1))
+        for _ in range(3):
+            await self.worker.process_batch(timeout=1)
+        self.assertEqual(len(self.queue.dead_jobs), 1)
+        self.assertEqual(self.queue.dead_jobs[0].attempts, 3)
+
+    async def test_unrenderable_job_is_dead(self):
+        broken = job(1)
+        broken.template = "missing.html"
+        await self.queue.put(broken)
+        await self.queue.put(job(2))
+        self.assertEqual(await self.worker.process_batch(timeout=0.1), 2)
+        # not retried, and the rest of the batch is sent
+        self.assertEqual([job.template for job in self.queue.dead_jobs], ["missing.html"])
+        self.assertEqual(await self.queue.size(), 0)
+        self.assertEqual(len(self.handler.messages), 1)
+        self.assertEqual(self.worker.stats(), {"sent": 1, "retried": 0, "failed": 1})
+
+class TestRedisMailQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        fakeredis = pytest.importorskip("fakeredis")
+        self.queue = RedisMailQueue(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    async def test_batches_and_retries(self):
+        for id in range(3):
+            await self.queue.put(job(id))
+        batch = await self.queue.get_batch(2, timeout=1)
+        self.assertEqual([job.recipient for job in batch], ["user0@mail.com", "user1@mail.com"])
+        batch[0].attempts = 1
+        await self.queue.retry(batch[0], 0)
+        batch = await self.queue.get_batch(10, timeout=1)
+        # due retries are sent before the jobs queued after them
+        self.assertEqual([job.recipient for job in batch], ["user0@mail.com", "user2@mail.com"])
+        self.assertEqual(batch[0].attempts, 1)
+        self.assertEqual(await self.queue.size(), 0)
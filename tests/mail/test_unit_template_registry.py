@@ -0,0 +1,40 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from app.mail.main import conf
+from app.mail.registry import TemplateRegistry, HTMLToText
+
+class TestTemplateRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.registry = TemplateRegistry(conf.TEMPLATE_FOLDER)
+        self.body = {"username": "<b>Tony</b>", "host": "http://localhost/", "token": "abc"}
+
+    async def test_render(self):
+        result = await self.registry.render_async("confirm_email.html", self.body)
+        self.assertIn("Hi &lt;b&gt;Tony&lt;/b&gt;,", result.html)
+        self.assertIn('href="http://localhost/api/auth/confirmed_email/abc"', result.html)
+        self.assertTrue(result.text.startswith("Hi <b>Tony</b>,\n"))
+        self.assertIn("Verification (http://localhost/api/auth/confirmed_email/abc)", result.text)
+
+    def test_templates_compiled_once(self):
+        self.registry.load()
+        with patch.object(self.registry.env, "get_template") as get_template, patch.object(self.registry.text_env, "from_string") as from_string:
+            for _ in range(3):
+                self.registry.render("confirm_email.html", self.body)
+        get_template.assert_not_called()
+        from_string.assert_not_called()
+
+    def test_text_template(self):
+        with tempfile.TemporaryDirectory() as folder:
+            Path(folder, "greeting.html").write_text("<p>Hello {{ name }}</p>")
+            Path(folder, "greeting.txt").write_text("Hello, {{ name }}!")
+            registry = TemplateRegistry(Path(folder))
+            registry.load()
+            result = registry.render("greeting.html", {"name": "Tony"})
+        self.assertEqual(result.html, "<p>Hello Tony</p>")
+        self.assertEqual(result.text, "Hello, Tony!")
+
+    def test_html_to_text(self):
+        html = "<html><head><style>p {}</style></head><body><p>One&amp;  two</p><ul><li>A</li><li>B</li></ul><a href='/x'>link</a></body></html>"
+        self.assertEqual(HTMLToText.convert(html), "One& two\n\nA\n\nB\nlink (/x)\n")
@@ -0,0 +1,64 @@
+import unittest
+import pytest
+from app.limiter import MemoryLimiter, RedisLimiter
+from users.models import User
+
+class TestMemoryLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = MemoryLimiter(maxsize=2)
+
+    def test_token_bucket(self):
+        self.assertEqual(self.limiter.take("a", times=2, seconds=10, now=0), 0)
+        self.assertEqual(self.limiter.take("a", times=2, seconds=10, now=0), 0)
+        self.assertAlmostEqual(self.limiter.take("a", times=2, seconds=10, now=1), 4)
+        # a token is refilled every 5 seconds
+        self.assertEqual(self.limiter.take("a", times=2, seconds=10, now=5), 0)
+        self.assertEqual(self.limiter.take("b", times=2, seconds=10, now=5), 0)
+
+    def test_drain(self):
+        self.limiter.take("a", times=1, seconds=10, now=0)
+        self.limiter.drain("a", times=1, seconds=10, tokens=-1, now=0)
+        self.assertAlmostEqual(self.limiter.take("a", times=1, seconds=10, now=10), 10)
+        self.assertEqual(self.limiter.take("a", times=1, seconds=10, now=20), 0)
+
+    def test_prune(self):
+        self.limiter.take("a", times=1, seconds=10, now=0)
+        self.limiter.take("b", times=1, seconds=100, now=0)
+        self.limiter.take("c", times=1, seconds=10, now=50)
+        self.assertEqual(set(self.limiter.buckets), {"b", "c"})
+
+class TestRedisLimiter(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        self.first = RedisLimiter(self.redis)
+        self.second = RedisLimiter(self.redis)
+
+    async def test_sync(self):
+        self.assertEqual(await self.first.hit("a", times=2, seconds=60), 0)
+        self.assertEqual(await self.second.hit("a", times=2, seconds=60), 0)
+        self.assertEqual(await self.second.hit("a", times=2, seconds=60), 0)
+        await self.first.sync()
+        await self.second.sync()
+        self.assertEqual(self.first.pending, {})
+        # three requests were allowed across the processes, the second one owes a token
+        self.assertGreater(await self.second.hit("a", times=2, seconds=60), 30)
+        self.assertEqual(await self.first.hit("a", times=2, seconds=60), 0)
+
+    async def test_redis_unavailable(self):
+        limiter = RedisLimiter()
+        self.assertEqual(await limiter.hit("a", times=1, seconds=60), 0)
+        await limiter.sync()
+        self.assertGreater(await limiter.hit("a", times=1, seconds=60), 0)
+
+@pytest.fixture(scope="module", autouse=True)
+def user(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.commit()
+
+def test_rate_limit(client, contact):
+    response = client.post("/api/contacts/", json=contact)
+    assert response.status_code == 201, response.text
+    response = client.post("/api/contacts/", json=contact)
+    assert response.status_code == 429
+    assert 0 < int(response.headers["retry-after"]) <= 10
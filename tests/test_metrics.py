@@ -0,0 +1,73 @@
+import re
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.metrics import Counter, Histogram, RequestTimings, format_labels, instrument_engine, request_timings
+from tests.conftest import async_engine
+
+instrument_engine(async_engine.sync_engine)
+
+def test_format_labels():
+    assert format_labels((), ()) == ""
+    assert format_labels(("route", "method"), ("/a", "GET")) == '{route="/a",method="GET"}'
+    assert format_labels(("route",), ('say "hi"\n',)) == '{route="say \\"hi\\"\\n"}'
+
+def test_histogram_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.1, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    lines = list(histogram.expose())
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.6' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+def test_counter():
+    counter = Counter("requests_total", "Requests.", ("status",))
+    counter.inc("200")
+    counter.inc("200")
+    counter.inc("429")
+    assert list(counter.expose())[2:] == ['requests_total{status="200"} 2', 'requests_total{status="429"} 1']
+
+def test_failed_statement_leaves_nothing_behind():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing"))
+        assert "metrics_started" not in conn.info
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        try:
+            conn.execute(text("SELECT 1"))
+        finally:
+            request_timings.reset(token)
+    assert timings.sql_count == 1
+    engine.dispose()
+
+def test_server_timing(client):
+    response = client.get("/api/contacts/")
+    assert response.status_code == 200, response.text
+    server_timing = response.headers["server-timing"]
+    assert re.match(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", pool;dur=[\d.]+$', server_timing)
+    assert int(re.search(r'"(\d+) queries"', server_timing).group(1)) > 0
+
+def test_metrics(client):
+    client.get("/api/contacts/")
+    client.get("/api/contacts/100500")
+    client.get("/not/a/route")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    metrics = response.text
+    # the registry is global, other tests add to the same series
+    assert re.search(r'http_requests_total\{route="/api/contacts/\{contact_id\}",method="GET",status="404"\} \d+', metrics)
+    assert re.search(r'http_requests_total\{route="<unmatched>",method="GET",status="404"\} \d+', metrics)
+    assert "/api/contacts/100500" not in metrics
+    assert re.search(r'http_request_duration_seconds_count\{route="/api/contacts/",method="GET"\} \d+', metrics)
+    assert re.search(r'http_request_sql_statements_bucket\{route="/api/contacts/",method="GET",le="0"\} 0\n', metrics)
+    assert "db_pool_connections{" in metrics
+    assert 'user_cache{stat="size"}' in metrics
+    assert 'password_hashing{stat="workers"}' in metrics
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app.db import Base
+from app.limiter import limiter
+from app.replicas import read_router
+from contacts.models import Contact
+from users.models import User
+
+def add_user_with_contact(db: Session, first_name: str) -> None:
+    db.add(User(id=1, username="Thanos", email="thanos@stones.five", password="", avatar="https://example.com/avatar.jpg"))
+    db.add(Contact(id=1, first_name=first_name, user_id=1))
+    db.commit()
+
+@pytest.fixture(scope="module")
+def replica(session, tmp_path_factory):
+    add_user_with_contact(session, "Primary")
+    path = tmp_path_factory.mktemp("replica") / "replica.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        add_user_with_contact(db, "Replica")
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    yield async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture(autouse=True)
+def no_rate_limit():
+    # contact updates are limited to one per 10 seconds
+    limiter.buckets.clear()
+
+@pytest.fixture
+def replicas(replica, client, monkeypatch):
+    monkeypatch.setattr(read_router, "sessionmakers", [replica])
+    client.cookies.clear()
+
+def test_reads_use_replica(client, replicas):
+    assert client.get("/api/contacts/1").json()["first_name"] == "Replica"
+    assert client.get("/api/users/").json()["contacts_count"] == 1
+    contacts = client.get("/api/users/", params={"include": "contacts"}).json()["contacts"]
+    assert [contact["first_name"] for contact in contacts] == ["Replica"]
+
+def test_writes_use_primary(client, replicas):
+    response = client.put("/api/contacts/1", json={"first_name": "Updated"})
+    assert response.status_code == 200, response.text
+    assert response.json()["first_name"] == "Updated"
+    assert read_router.cookie in response.cookies
+
+def test_reads_after_write_stick_to_primary(client, replicas):
+    client.put("/api/contacts/1", json={"first_name": "Sticky"})
+    assert client.get("/api/contacts/1").json()["first_name"] == "Sticky"
+    client.cookies.clear()
+    assert client.get("/api/contacts/1").json()["first_name"] == "Replica"
+
+def test_failed_writes_are_not_sticky(client, replicas):
+    response = client.put("/api/contacts/100", json={"first_name": "Nobody"})
+    assert response.status_code == 404
+    assert read_router.cookie not in response.cookies
+
+def test_no_replicas(client):
+    response = client.put("/api/contacts/1", json={"first_name": "Alone"})
+    assert read_router.cookie not in response.cookies
+    client.cookies.clear()
+    assert client.get("/api/contacts/1").json()["first_name"] == "Alone"
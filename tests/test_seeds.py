@@ -0,0 +1,32 @@
+import csv
+import pytest
+from sqlalchemy import select, func
+from app.seeds import seed, write_credentials
+from contacts.models import Contact
+from users.models import User
+from tests.conftest import engine
+
+def test_seed(session, tmp_path):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.commit()
+    first_id, last_id = seed(engine, users=30, contacts=250, workers=2, batch_size=40, password="secret")
+    assert (first_id, last_id) == (2, 31)
+    assert session.scalar(select(func.count()).select_from(User)) == 31
+    assert session.scalar(select(func.count(func.distinct(User.email)))) == 31
+    assert session.scalar(select(func.count()).select_from(Contact).where(Contact.user_id.between(2, 31))) == 250
+    user = session.get(User, 2)
+    assert user.confirmed_at is not None
+    assert user.password.startswith("$2b$")
+    contact = session.scalar(select(Contact))
+    assert contact.birthday is not None and contact.phone.startswith("+38")
+
+    path = tmp_path / "users.csv"
+    write_credentials(engine, path, first_id, last_id, "secret")
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 30
+    assert rows[0] == {"email": user.email, "password": "secret"}
+
+def test_seed_contacts_for_existing_users(session):
+    seed(engine, users=0, contacts=10, workers=1, batch_size=10, password="secret")
+    assert session.scalar(select(func.count()).select_from(Contact)) == 260
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import pytest
+import tracemalloc
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, event
+from app.limiter import limiter
+from app.settings import TOKEN_CONFIG, TokenConfig
+from users.auth import auth
+from users.models import User, Token
+from users.sweeper import TokenSweeper
+from tests.conftest import TestingAsyncSessionLocal, async_engine
+
+@pytest.fixture(scope="module", autouse=True)
+def user(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=auth.password.hash("123123123"), confirmed_at=datetime.now()))
+    session.commit()
+
+@pytest.fixture(scope="module")
+def tokens(client):
+    response = client.post("/api/auth/login", data={"username": "thanos@stones.five", "password": "123123123"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_login_stores_token_digest(session, tokens):
+    token = session.scalar(select(Token).where(Token.user_id == 1))
+    assert token.token_hash == hashlib.sha256(tokens["refresh_token"].encode()).hexdigest()
+    expected = datetime.utcnow() + timedelta(minutes=TOKEN_CONFIG.refresh_expired)
+    assert abs(token.expires_at - expected) < timedelta(minutes=1)
+
+def test_refresh_rotates_token(client, session, tokens):
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 200, response.text
+    assert response.json()["refresh_token"] != tokens["refresh_token"]
+    assert session.scalar(select(func.count()).select_from(Token)) == 1
+    rotated = response.json()
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 401, response.text
+    tokens["rotated"] = rotated["refresh_token"]
+
+def test_reused_token_revokes_family(client, session, tokens):
+    session.add(Token(token_hash="other", expires_at=datetime.utcnow() + timedelta(minutes=1), user_id=1, family="other"))
+    session.commit()
+    # the rotated token was reused above, its successor is revoked with it
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens['rotated']}"})
+    assert response.status_code == 401, response.text
+    assert session.scalars(select(Token.family)).all() == ["other"]
+
+def test_sweep_expired_tokens(session):
+    now = datetime.utcnow()
+    session.add_all([Token(token_hash=f"expired-{id}", expires_at=now - timedelta(minutes=1), user_id=1, family=f"expired-{id}") for id in range(2500)])
+    session.add(Token(token_hash="valid", expires_at=now + timedelta(minutes=1), user_id=1, family="valid"))
+    session.commit()
+    sweeper = TokenSweeper(TestingAsyncSessionLocal, interval=3600, batch_size=1000)
+    assert asyncio.run(sweeper.sweep()) == 2500
+    assert session.scalar(select(func.count()).select_from(Token).where(Token.expires_at <= now)) == 0
+    assert session.scalar(select(Token).where(Token.token_hash == "valid")) is not None
+
+def login_statements(client) -> list:
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    limiter.buckets.clear()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    tracemalloc.start()
+    try:
+        response = client.post("/api/auth/login", data={"username": "thanos@stones.five", "password": "123123123"})
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == 200, response.text
+    return statements, peak
+
+def test_login_does_not_load_tokens(client, session, monkeypatch):
+    monkeypatch.setattr(auth, "max_sessions", 100_000)
+    few, few_peak = login_statements(client)
+    session.add_all([Token(token_hash=f"session-{id}", expires_at=datetime.utcnow() + timedelta(days=1), user_id=1, family=f"session-{id}") for id in range(5000)])
+    session.commit()
+    many, many_peak = login_statements(client)
+    assert len(many) == len(few)
+    assert not any(statement.lstrip().upper().startswith("SELECT") and "FROM tokens" in statement for statement in many)
+    # loading 5000 tokens would take megabytes
+    assert many_peak - few_peak < 512 * 1024
+
+def test_login_limits_sessions(client, session, monkeypatch):
+    monkeypatch.setattr(auth, "max_sessions", 3)
+    login_statements(client)
+    login_statements(client)
+    hashes = session.scalars(select(Token.token_hash).where(Token.user_id == 1).order_by(Token.id)).all()
+    assert len(hashes) == 3
+    assert not any(hash.startswith("session-") for hash in hashes)
+
+@pytest.mark.parametrize("max_sessions", [0, -1])
+def test_max_sessions_at_least_one(max_sessions):
+    with pytest.raises(ValueError):
+        TokenConfig(max_sessions=max_sessions)
@@ -0,0 +1,74 @@
+import asyncio
+import io
+import pytest
+import cloudinary.uploader
+from PIL import Image
+from users.avatar import avatar_pipeline, LocalAvatarStorage, CloudinaryAvatarStorage
+from users.models import User
+
+class CountingStorage(LocalAvatarStorage):
+    saved = 0
+
+    async def save(self, key: str, data: bytes) -> None:
+        self.saved += 1
+        await super().save(key, data)
+
+@pytest.fixture(scope="module", autouse=True)
+def user(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password=""))
+    session.commit()
+
+@pytest.fixture(scope="module")
+def storage(tmp_path_factory):
+    original = avatar_pipeline.storage
+    avatar_pipeline.storage = CountingStorage(tmp_path_factory.mktemp("avatars"), "/media/avatars")
+    yield avatar_pipeline.storage
+    avatar_pipeline.storage = original
+
+def image(color: tuple, size: tuple = (1000, 600), format: str = "PNG") -> bytes:
+    output = io.BytesIO()
+    Image.new("RGBA", size, color).save(output, format=format)
+    return output.getvalue()
+
+def test_upload_avatar(client, storage):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", image((255, 0, 0, 128)), "image/png")})
+    assert response.status_code == 200, response.text
+    url = response.json()["avatar"]
+    assert url.startswith("/media/avatars/") and url.endswith(".jpg")
+    with Image.open(storage.root / url.rsplit("/", 1)[1]) as avatar:
+        assert avatar.format == "JPEG"
+        assert avatar.size == (250, 250)
+    assert storage.saved == 1
+
+def test_upload_same_avatar_is_skipped(client, storage):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", image((255, 0, 0, 128)), "image/png")})
+    assert response.status_code == 200, response.text
+    assert storage.saved == 1
+
+def test_upload_new_avatar(client, storage):
+    before = client.get("/api/users/").json()["avatar"]
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", image((0, 0, 255, 255), size=(300, 900)), "image/png")})
+    assert response.status_code == 200, response.text
+    assert response.json()["avatar"] != before
+    assert storage.saved == 2
+
+def test_upload_invalid_image(client, storage):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", b"not an image", "image/png")})
+    assert response.status_code == 400, response.text
+    assert storage.saved == 2
+
+def test_upload_too_large(client, storage, monkeypatch):
+    monkeypatch.setattr(avatar_pipeline, "max_bytes", 1024)
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", b"0" * 4096, "image/png")})
+    assert response.status_code == 413, response.text
+
+def test_cloudinary_storage_uploads_without_admin_api(monkeypatch):
+    uploads = []
+    monkeypatch.setattr(cloudinary.uploader, "upload", lambda file, **options: uploads.append(options) or {"existing": False})
+    storage = CloudinaryAvatarStorage("cloud", "key", "secret", known_size=1)
+    assert asyncio.run(storage.exists("a")) is False
+    asyncio.run(storage.save("a", b"jpeg"))
+    assert asyncio.run(storage.exists("a")) is True
+    assert uploads == [{"public_id": "ContactsApp/a", "overwrite": False, "unique_filename": False}]
+    asyncio.run(storage.save("b", b"jpeg"))
+    assert asyncio.run(storage.exists("a")) is False
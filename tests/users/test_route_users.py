@@ -0,0 +1,48 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from contacts.models import Contact
+from users.models import User
+from tests.conftest import async_engine
+
+@pytest.fixture(scope="module", autouse=True)
+def contacts(session):
+    session.add(User(id=1, username="Thanos", email="thanos@stones.five", password="", avatar="https://avatar.url"))
+    session.add_all([Contact(first_name=f"Contact {id}", user_id=1) for id in range(250)])
+    session.commit()
+
+@contextmanager
+def count_statements():
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+def test_read_user(client):
+    response = client.get("/api/users/")
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["email"] == "thanos@stones.five"
+    assert data["contacts_count"] == 250
+    assert "contacts" not in data
+
+def test_read_user_statements(client):
+    with count_statements() as statements:
+        response = client.get("/api/users/")
+    assert response.status_code == 200, response.text
+    # authenticated user lookup and the count aggregate
+    assert len(statements) == 2, statements
+
+def test_read_user_with_contacts(client):
+    with count_statements() as statements:
+        response = client.get("/api/users/", params={"include": "contacts"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["email"] == "thanos@stones.five"
+    assert len(data["contacts"]) == 250
+    assert data["contacts"][0]["first_name"] == "Contact 0"
+    assert len(statements) == 2, statements
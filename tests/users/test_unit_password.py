@@ -0,0 +1,43 @@
+import unittest
+import asyncio
+from passlib.context import CryptContext
+from users.auth import Password
+
+
+class TestPassword(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.password = Password(CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=10), workers=2)
+
+    async def test_hash_async(self):
+        hash = await self.password.hash_async("123123123")
+        self.assertTrue(self.password.verify("123123123", hash))
+
+    async def test_verify_async(self):
+        hash = self.password.hash("123123123")
+        self.assertTrue(await self.password.verify_async("123123123", hash))
+        self.assertFalse(await self.password.verify_async("321321321", hash))
+
+    async def test_does_not_block_event_loop(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        await self.password.hash_async("123123123")
+        task.cancel()
+        self.assertGreater(ticks, 1)
+
+    async def test_stats(self):
+        await asyncio.gather(*[self.password.hash_async("123123123") for _ in range(4)])
+        stats = self.password.stats()
+        self.assertEqual(stats["workers"], 2)
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["active"], 0)
+        self.assertEqual(stats["completed"], 4)
+
+if __name__ == "__main__":
+    unittest.main()
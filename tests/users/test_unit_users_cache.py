@@ -0,0 +1,69 @@
+import unittest
+import time
+import json
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import RedisCache
+from users.cache import UserCache
+from users.models import User
+from users.auth import auth
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.cache = UserCache(maxsize=2, local_ttl=30)
+        self.user = User(id=1, username="username", email="test@mail.com", avatar=None, created_at=None, confirmed_at=None)
+
+    async def test_get_miss(self):
+        result = await self.cache.get("test@mail.com")
+        self.assertIsNone(result)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    async def test_get_hit(self):
+        await self.cache.set("test@mail.com", self.user, time.time() + 60)
+        result = await self.cache.get("test@mail.com")
+        self.assertEqual(result.id, self.user.id)
+        self.assertEqual(result.email, self.user.email)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    async def test_set_expired_token(self):
+        await self.cache.set("test@mail.com", self.user, time.time() - 1)
+        self.assertIsNone(await self.cache.get("test@mail.com"))
+
+    async def test_invalidate(self):
+        await self.cache.set("test@mail.com", self.user, time.time() + 60)
+        await self.cache.invalidate("test@mail.com")
+        self.assertIsNone(await self.cache.get("test@mail.com"))
+
+    async def test_lru_eviction(self):
+        for id in range(3):
+            await self.cache.set(f"{id}@mail.com", User(id=id, email=f"{id}@mail.com", created_at=None, confirmed_at=None), time.time() + 60)
+        self.assertIsNone(await self.cache.get("0@mail.com"))
+        self.assertIsNotNone(await self.cache.get("2@mail.com"))
+
+    async def test_redis_tier(self):
+        redis = AsyncMock()
+        data = { "id": 1, "username": "username", "email": "test@mail.com", "avatar": None, "created_at": None, "confirmed_at": None, "expires_at": time.time() + 60 }
+        redis.get.return_value = json.dumps(data)
+        with patch.object(RedisCache, "redis", redis):
+            result = await self.cache.get("test@mail.com")
+        self.assertEqual(result.id, 1)
+        self.assertEqual(self.cache.stats()["redis_hits"], 1)
+
+class TestAuthCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.session = AsyncMock(spec=AsyncSession)
+        self.cache = UserCache(maxsize=10, local_ttl=30)
+
+    async def test_second_request_skips_db(self):
+        user = User(id=1, username="username", email="test@mail.com", avatar=None, created_at=None, confirmed_at=None)
+        self.session.scalar.return_value = user
+        token = await auth.token.create_access({"sub": user.email})
+        with patch.object(auth, "cache", self.cache):
+            first = await auth(token=token, db=self.session)
+            second = await auth(token=token, db=self.session)
+        self.assertEqual(first.id, second.id)
+        self.session.scalar.assert_awaited_once()
+
+if __name__ == "__main__":
+    unittest.main()
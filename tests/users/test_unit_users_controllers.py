@@ -1,7 +1,7 @@
 import unittest
 from datetime import datetime
-from unittest.mock import MagicMock, patch
-from sqlalchemy.orm import Session
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 from users.controllers import AuthController, UsersController
 from users.models import User
 from users.schemas import UserCreationModel
@@ -10,16 +10,16 @@ from contacts.models import Contact
 class TestAuthControllers(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.controller = AuthController()
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
 
     async def test_get_user_found(self):
         user = User()
-        self.session.query().filter().first.return_value = user
+        self.session.scalar.return_value = user
         result = await self.controller.get_user(email="test@mail.com", db=self.session)
         self.assertEqual(result, user)
 
     async def test_get_user_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.session.scalar.return_value = None
         result = await self.controller.get_user(email="test@mail.com", db=self.session)
         self.assertIsNone(result)
 
@@ -41,7 +41,7 @@ class TestAuthControllers(unittest.IsolatedAsyncioTestCase):
 class TestUserController(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.controller = UsersController()
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
     
     async def test_update_avatar(self):
         user = User()
@@ -49,5 +49,12 @@ class TestUserController(unittest.IsolatedAsyncioTestCase):
         result = await self.controller.update_avatar(user=user, url=url, db=self.session)
         self.assertEqual(result.avatar, url)
 
+    async def test_read(self):
+        user = User(id=1, username="username", email="test@mail.com", avatar="https://test.url", created_at=datetime.now())
+        self.session.scalar.return_value = 3
+        result = await self.controller.read(user=user, db=self.session)
+        self.assertEqual(result.email, user.email)
+        self.assertEqual(result.contacts_count, 3)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
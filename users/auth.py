@@ -1,5 +1,6 @@
 from fastapi import HTTPException, status, Depends
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from passlib.context import CryptContext
@@ -7,11 +8,17 @@ from datetime import timedelta, datetime
 from typing import Optional
 from enum import Enum
 from app.settings import TOKEN_CONFIG, TokenConfig
-from app.db import get_db
+from app.db import get_async_db
 from users.models import User, Token as TokenDBModel
+from users.cache import UserCache, user_cache
 from users import schemas
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from typing import Callable, List
+import asyncio
+import hashlib
+import uuid
 
 class TokenScopes(Enum):
     ACCESS='access_token'
@@ -19,14 +26,45 @@ class TokenScopes(Enum):
     EMAIL_CONFIRMATION='email_confirmation_token'
 
 class Password:
-    def __init__(self, pwd_context: CryptContext):
+    def __init__(self, pwd_context: CryptContext, workers: int = 4):
         self.pwd_context = pwd_context
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self.lock = Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
 
     def hash(self, password: str) -> str:
         return self.pwd_context.hash(password)
     
     def verify(self, password: str, hash: str) -> bool:
         return self.pwd_context.verify(password, hash)
+
+    async def hash_async(self, password: str) -> str:
+        return await self.__offload(self.hash, password)
+
+    async def verify_async(self, password: str, hash: str) -> bool:
+        return await self.__offload(self.verify, password, hash)
+
+    def stats(self) -> dict:
+        return { "workers": self.workers, "queued": self.queued, "active": self.active, "completed": self.completed }
+
+    async def __offload(self, func: Callable, *args):
+        with self.lock:
+            self.queued += 1
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.__run, func, *args)
+
+    def __run(self, func: Callable, *args):
+        with self.lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return func(*args)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.completed += 1
     
 @dataclass
 class TokenCoder:
@@ -34,6 +72,9 @@ class TokenCoder:
     decode: Callable[[str, str, List[str]], dict]
     error: Exception
     
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
 class Token:
     def __init__(self, config: TokenConfig, coder: TokenCoder) -> None:
         self.config = config
@@ -48,10 +89,14 @@ class Token:
         return token
     
     async def decode(self, token: str, scope: TokenScopes) -> str:
+        payload = await self.decode_payload(token, scope)
+        return payload["sub"]
+
+    async def decode_payload(self, token: str, scope: TokenScopes) -> dict:
         try:
             payload = self.coder.decode(token, self.config.secret_key, algorithms=[self.config.algorithm])
             if payload['scope'] == scope.value:
-                return payload["sub"]
+                return payload
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid scope for token")
         except self.coder.error as e:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
@@ -68,6 +113,9 @@ class Token:
     async def decode_access(self, token: str) -> str:
         return await self.decode(token, TokenScopes.ACCESS)
 
+    async def decode_access_payload(self, token: str) -> dict:
+        return await self.decode_payload(token, TokenScopes.ACCESS)
+
     async def decode_refresh(self, token: str) -> str:
         return await self.decode(token, TokenScopes.REFRESH)
     
@@ -87,61 +135,100 @@ class Auth:
         headers={"WWW-Authenticate": "Bearer"}
     )
 
-    def __init__(self, password: Password, token: Token) -> None:
+    def __init__(self, password: Password, token: Token, cache: UserCache, max_sessions: int = 10) -> None:
         self.password = password
         self.token = token
+        self.cache = cache
+        self.max_sessions = max_sessions
 
-    def validate(self, user: user_model | None, credentials: OAuth2PasswordRequestForm) -> bool:
+    async def validate(self, user: user_model | None, credentials: OAuth2PasswordRequestForm) -> bool:
         if user is None:
             return False
-        if not self.password.verify(credentials.password, user.password):
+        if not await self.password.verify_async(credentials.password, user.password):
             return False
         return True
     
-    async def refresh(self, refres_token_str: str, db: Session) -> schemas.TokenModel:
-        email = await self.token.decode_refresh(refres_token_str)
-        refres_token = db.query(self.tokens_model).filter(
-            self.tokens_model.token==refres_token_str
-            ).options(joinedload(self.tokens_model.user)).first()
-        user = await self.__get_user(email, db)
-        if refres_token:
-            db.delete(refres_token)
-            db.commit()
-        print(user, refres_token)
-        if user is None or refres_token is None or refres_token.user != user:
+    async def refresh(self, refres_token_str: str, db: AsyncSession) -> schemas.TokenModel:
+        """
+        Rotates a refresh token in one transaction: the token is deleted with ``DELETE ... RETURNING``
+        and its successor of the same family is inserted before a single commit. A token that is
+        not stored anymore was already rotated, so its family is revoked.
+
+        :param refres_token_str: The refresh token.
+        :type refres_token_str: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The new access and refresh tokens.
+        :rtype: TokenModel
+        """
+        payload = await self.token.decode_payload(refres_token_str, TokenScopes.REFRESH)
+        stmt = delete(self.tokens_model).where(self.tokens_model.token_hash == token_digest(refres_token_str))
+        rotated = (await db.execute(stmt.returning(self.tokens_model.user_id, self.tokens_model.family))).one_or_none()
+        if rotated is None:
+            # the family is in the token itself, revoking it needs no lookup
+            if payload.get("fam"):
+                await db.execute(delete(self.tokens_model).where(self.tokens_model.family == payload["fam"]))
+                await db.commit()
             raise self.credentionals_exception
-        return await self.__generate_tokens(user, db)
+        user_id, family = rotated
+        # the token is signed, its subject is the email of the user the stored token belongs to
+        return await self.__generate_tokens(self.user_model(id=user_id, email=payload["sub"]), db, family)
         
-    async def authenticate(self, credentials: OAuth2PasswordRequestForm, db: Session) -> schemas.TokenModel:
+    async def authenticate(self, credentials: OAuth2PasswordRequestForm, db: AsyncSession) -> schemas.TokenModel:
         user = await self.__get_user(credentials.username, db)
-        if not self.validate(user, credentials):
+        if not await self.validate(user, credentials):
             raise self.invalid_credential_error
         if user.confirmed_at is None:
             raise self.invalid_confirmation_error
         return await self.__generate_tokens(user, db)
     
-    async def __generate_tokens(self, user: user_model, db: Session) -> schemas.TokenModel:
+    async def __generate_tokens(self, user: user_model, db: AsyncSession, family: str | None = None) -> schemas.TokenModel:
         access_token_str = await self.token.create_access({"sub": user.email})
-        refresh_token_str = await self.token.create_refresh({"sub": user.email})
-        refresh_token = self.tokens_model(token=refresh_token_str)
-        user.tokens.append(refresh_token)
-        db.commit()
-        return { "access_token": access_token_str, "refresh_token": refresh_token.token, type: "bearer" }
+        expires_at = datetime.utcnow() + timedelta(minutes=self.token.config.refresh_expired)
+        if family is None:
+            family = uuid.uuid4().hex
+            await self.__limit_sessions(user, db)
+        # jti keeps refresh tokens issued within the same second unique
+        refresh_token_str = await self.token.create_refresh({"sub": user.email, "jti": uuid.uuid4().hex, "fam": family})
+        db.add(self.tokens_model(token_hash=token_digest(refresh_token_str), expires_at=expires_at, user_id=user.id, family=family))
+        await db.commit()
+        return { "access_token": access_token_str, "refresh_token": refresh_token_str, type: "bearer" }
         
-    async def __get_user(self, email: str, db: Session) -> user_model | None:
-        return db.query(self.user_model).filter(self.user_model.email == email).first()
+    async def __limit_sessions(self, user: user_model, db: AsyncSession) -> None:
+        # a rotated token gets a new id, so the tokens with the lowest ids are the least recently used sessions
+        oldest = (
+            select(self.tokens_model.id)
+            .where(self.tokens_model.user_id == user.id)
+            .order_by(self.tokens_model.id.desc())
+            .offset(self.max_sessions - 1)
+        )
+        await db.execute(delete(self.tokens_model).where(self.tokens_model.id.in_(oldest.scalar_subquery())))
+
+    async def __get_user(self, email: str, db: AsyncSession) -> user_model | None:
+        return await db.scalar(select(self.user_model).where(self.user_model.email == email))
 
-    async def __call__(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> user_model:
-        email = await self.token.decode_access(token)
+    async def __call__(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> user_model:
+        payload = await self.token.decode_access_payload(token)
+        email = payload.get("sub")
         if email is None:
             raise self.credentionals_exception
+        user = await self.cache.get(email)
+        if user is not None:
+            db.add(user)
+            return user
         user = await self.__get_user(email, db)
         if user is None:
             raise self.credentionals_exception
+        await self.cache.set(email, user, payload["exp"])
         return user
         
 
 auth = Auth(
-    password=Password(CryptContext(schemes=['bcrypt'], deprecated='auto')),
-    token=Token(config=TOKEN_CONFIG, coder=TokenCoder(encode=jwt.encode, decode=jwt.decode, error=JWTError))
+    password=Password(
+        CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=TOKEN_CONFIG.bcrypt_rounds),
+        workers=TOKEN_CONFIG.password_workers
+    ),
+    token=Token(config=TOKEN_CONFIG, coder=TokenCoder(encode=jwt.encode, decode=jwt.decode, error=JWTError)),
+    cache=user_cache,
+    max_sessions=TOKEN_CONFIG.max_sessions
 )
\ No newline at end of file
@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pathlib import Path
+from app import settings
+from collections import OrderedDict
+import asyncio
+import hashlib
+import io
+import uuid
+import cloudinary
+import cloudinary.uploader
+
+class AvatarStorage(ABC):
+    """
+    Stores processed avatars under content addressed keys, so a stored avatar never changes
+    and the same image uploaded twice is stored once.
+    """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    async def save(self, key: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    def url(self, key: str) -> str: ...
+
+class LocalAvatarStorage(AvatarStorage):
+    def __init__(self, root: Path, base_url: str) -> None:
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self.__path(key).exists)
+
+    async def save(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self.__write, self.__path(key), data)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}.jpg"
+
+    def __path(self, key: str) -> Path:
+        return self.root / f"{key}.jpg"
+
+    def __write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so a concurrent reader never sees a partial file
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+class CloudinaryAvatarStorage(AvatarStorage):
+    """
+    Existence is not asked from the rate limited Admin API: keys uploaded by this process are
+    remembered, and an upload of a key stored earlier elsewhere is a no-op as ``overwrite`` is off.
+    """
+
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str, folder: str = "ContactsApp", known_size: int = 10000) -> None:
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+        self.folder = folder
+        self.known_size = known_size
+        self.__known: OrderedDict[str, None] = OrderedDict()
+
+    async def exists(self, key: str) -> bool:
+        if key not in self.__known:
+            return False
+        self.__known.move_to_end(key)
+        return True
+
+    async def save(self, key: str, data: bytes) -> None:
+        # the Cloudinary SDK is blocking, run the upload in a thread
+        await asyncio.to_thread(
+            cloudinary.uploader.upload,
+            io.BytesIO(data),
+            public_id=self.__public_id(key),
+            overwrite=False,
+            unique_filename=False
+        )
+        self.__known[key] = None
+        if len(self.__known) > self.known_size:
+            self.__known.popitem(last=False)
+
+    def url(self, key: str) -> str:
+        return cloudinary.CloudinaryImage(self.__public_id(key)).build_url(secure=True)
+
+    def __public_id(self, key: str) -> str:
+        return f"{self.folder}/{key}"
+
+@dataclass(frozen=True)
+class Avatar:
+    hash: str
+    url: str
+
+class AvatarPipeline:
+    """
+    Reads an uploaded image in chunks while hashing it, resizes it to ``size`` in a worker
+    pool and pushes the result to the storage. Re-uploading the current avatar is a no-op.
+    """
+    invalid_image_error = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not a supported image")
+    too_large_error = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar is too large")
+
+    def __init__(self, storage: AvatarStorage, workers: int = 2, max_bytes: int = 10 * 1024 * 1024, size: tuple[int, int] = (250, 250), chunk_size: int = 64 * 1024) -> None:
+        self.storage = storage
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="avatar")
+        self.max_bytes = max_bytes
+        self.size = size
+        self.chunk_size = chunk_size
+
+    async def process(self, file: UploadFile, current_hash: str | None = None) -> Avatar | None:
+        """
+        Processes an uploaded avatar.
+
+        :param file: The uploaded image.
+        :type file: UploadFile
+        :param current_hash: The content hash of the current avatar of the user.
+        :type current_hash: str | None
+        :return: The stored avatar, or None if the image is the current avatar.
+        :rtype: Avatar | None
+        """
+        data, hash = await self.read(file)
+        if hash == current_hash:
+            return None
+        key = hash
+        if not await self.storage.exists(key):
+            resized = await asyncio.get_running_loop().run_in_executor(self.executor, self.resize, data)
+            await self.storage.save(key, resized)
+        return Avatar(hash=hash, url=self.storage.url(key))
+
+    async def read(self, file: UploadFile) -> tuple[bytes, str]:
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        while chunk := await file.read(self.chunk_size):
+            digest.update(chunk)
+            buffer += chunk
+            if len(buffer) > self.max_bytes:
+                raise self.too_large_error
+        return bytes(buffer), digest.hexdigest()
+
+    def resize(self, data: bytes) -> bytes:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                # JPEG can be decoded at a fraction of its size, enough for a thumbnail
+                image.draft("RGB", (self.size[0] * 2, self.size[1] * 2))
+                image = ImageOps.exif_transpose(image)
+                thumbnail = ImageOps.fit(image, self.size, method=Image.Resampling.LANCZOS)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise self.invalid_image_error
+        if thumbnail.mode != "RGB":
+            background = Image.new("RGB", thumbnail.size, "white")
+            background.paste(thumbnail, mask=thumbnail.convert("RGBA").getchannel("A"))
+            thumbnail = background
+        output = io.BytesIO()
+        thumbnail.save(output, format="JPEG", quality=85, optimize=True)
+        return output.getvalue()
+
+def create_storage() -> AvatarStorage:
+    if settings.AVATAR_STORAGE == "local":
+        return LocalAvatarStorage(settings.AVATAR_LOCAL_PATH, settings.AVATAR_LOCAL_URL)
+    return CloudinaryAvatarStorage(settings.CLOUDINARY_NAME, settings.CLOUDINARY_KEY, settings.CLOUDINARY_SECRET)
+
+avatar_pipeline = AvatarPipeline(create_storage(), workers=settings.AVATAR_WORKERS, max_bytes=settings.AVATAR_MAX_BYTES)
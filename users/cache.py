@@ -0,0 +1,89 @@
+from app.cache import LRUCache, RedisCache
+from app.settings import USER_CACHE_SIZE, USER_CACHE_LOCAL_TTL
+from users.models import User
+from sqlalchemy.orm import make_transient_to_detached
+from datetime import datetime
+from redis.exceptions import RedisError
+import json
+import time
+
+class UserCache:
+    """
+    Two tier cache of authenticated users keyed by the token ``sub``.
+    The in-process LRU tier keeps entries for at most ``local_ttl`` seconds
+    so other workers pick up invalidations quickly, the Redis tier keeps
+    them until the access token that populated the entry expires.
+    """
+    user_model = User
+    fields = ("id", "username", "email", "avatar", "avatar_hash", "created_at", "confirmed_at")
+    datetime_fields = ("created_at", "confirmed_at")
+
+    def __init__(self, maxsize: int, local_ttl: float, prefix: str = "auth:user:") -> None:
+        self.local = LRUCache(maxsize)
+        self.local_ttl = local_ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get(self, sub: str) -> user_model | None:
+        data = self.local.get(sub)
+        if data is not None:
+            self.hits += 1
+            return self.__load(data)
+        if RedisCache.redis is not None:
+            try:
+                raw = await RedisCache.redis.get(self.prefix + sub)
+            except RedisError:
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                data = json.loads(raw)
+                self.local.set(sub, data, min(self.local_ttl, data["expires_at"] - time.time()))
+                return self.__load(data)
+        self.misses += 1
+        return None
+
+    async def set(self, sub: str, user: user_model, expires_at: float) -> None:
+        ttl = expires_at - time.time()
+        if ttl <= 0:
+            return
+        data = self.__dump(user)
+        data["expires_at"] = expires_at
+        self.local.set(sub, data, min(self.local_ttl, ttl))
+        if RedisCache.redis is not None:
+            try:
+                await RedisCache.redis.set(self.prefix + sub, json.dumps(data), ex=max(int(ttl), 1))
+            except RedisError:
+                pass
+
+    async def invalidate(self, sub: str) -> None:
+        self.local.delete(sub)
+        if RedisCache.redis is not None:
+            try:
+                await RedisCache.redis.delete(self.prefix + sub)
+            except RedisError:
+                pass
+
+    def stats(self) -> dict:
+        return { "hits": self.hits, "redis_hits": self.redis_hits, "misses": self.misses, "size": len(self.local) }
+
+    def __dump(self, user: user_model) -> dict:
+        data = { field: getattr(user, field) for field in self.fields }
+        for field in self.datetime_fields:
+            if data[field] is not None:
+                data[field] = data[field].isoformat()
+        return data
+
+    def __load(self, data: dict) -> user_model:
+        # entries cached before a field was added do not have it
+        values = { field: data.get(field) for field in self.fields }
+        for field in self.datetime_fields:
+            if values[field] is not None:
+                values[field] = datetime.fromisoformat(values[field])
+        user = self.user_model(**values)
+        # detached instances can be attached to a request session without a SELECT
+        make_transient_to_detached(user)
+        return user
+
+user_cache = UserCache(maxsize=USER_CACHE_SIZE, local_ttl=USER_CACHE_LOCAL_TTL)
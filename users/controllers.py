@@ -1,48 +1,55 @@
 from libgravatar import Gravatar
 from users.models import User
-from sqlalchemy.orm import Session
+from users.cache import user_cache
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, func
+from contacts.models import Contact
+from contacts.schemas import ContactResponse
+from typing import AsyncIterator
 from users import schemas
 from datetime import datetime
+import orjson
 
 class AuthController:
     base_model = User
 
-    async def get_user(self, email: str, db: Session) -> base_model | None:
+    async def get_user(self, email: str, db: AsyncSession) -> base_model | None:
         """
         Retrieves a single user with the specified email.
 
         :param email: The email of the user to retrieve.
         :type email: str
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The user with the specified email, or None if it does not exist.
         :rtype: User | None
         """
-        return db.query(self.base_model).filter(self.base_model.email == email).first()
+        return await db.scalar(select(self.base_model).where(self.base_model.email == email))
     
-    async def comfirm_email(self, email, db: Session) -> None:
+    async def comfirm_email(self, email, db: AsyncSession) -> None:
         """
         Add flag as confirmed user
 
         :param email: The email of the user who should be confirmed.
         :type email: str
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: None.
         :rtype: None
         """
         user = await self.get_user(email, db)
         user.confirmed_at = datetime.now()
-        db.commit()
+        await db.commit()
+        await user_cache.invalidate(email)
     
-    async def create(self, body: schemas.UserCreationModel, db: Session) -> base_model:
+    async def create(self, body: schemas.UserCreationModel, db: AsyncSession) -> base_model:
         """
         Creates a new user.
 
         :param body: The data for the user to create.
         :type body: UserCreationModel
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The newly created user.
         :rtype: User
         """
@@ -54,14 +61,76 @@ class AuthController:
             print("Avatar exception:", e)
         user = self.base_model(**body.model_dump(), avatar=avatar)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return user
     
 class UsersController:
     base_model = User
 
-    async def update_avatar(self, user: base_model, url: str, db: Session):
+    contact_model = Contact
+
+    async def update_avatar(self, user: base_model, url: str, db: AsyncSession, avatar_hash: str | None = None):
+        """
+        Sets the avatar of a user.
+
+        :param user: The user to update.
+        :type user: User
+        :param url: The url of the new avatar.
+        :type url: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :param avatar_hash: The content hash of the uploaded image.
+        :type avatar_hash: str | None
+        :return: The updated user.
+        :rtype: User
+        """
         user.avatar = url
-        db.commit()
-        return user
\ No newline at end of file
+        user.avatar_hash = avatar_hash
+        await db.commit()
+        await user_cache.invalidate(user.email)
+        return user
+
+    async def read(self, user: base_model, db: AsyncSession) -> schemas.UserResponse:
+        """
+        Builds the profile of a user with the number of contacts counted by an aggregate query.
+
+        :param user: The user to build the profile for.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The user profile.
+        :rtype: UserResponse
+        """
+        count = await db.scalar(select(func.count()).where(self.contact_model.user_id == user.id))
+        profile = schemas.UserResponse.model_validate(user)
+        profile.contacts_count = count
+        return profile
+
+    async def stream_with_contacts(self, user: base_model, session_factory: async_sessionmaker[AsyncSession], chunk_size: int = 500) -> AsyncIterator[bytes]:
+        """
+        Streams the profile of a user followed by all of the user's contacts as a JSON document,
+        fetching contacts from the database in chunks. The session is opened here rather than
+        taken from the endpoint, the body is sent after the endpoint's dependencies are closed.
+
+        :param user: The user to stream the profile for.
+        :type user: User
+        :param session_factory: Opens the session the contacts are read with.
+        :type session_factory: async_sessionmaker[AsyncSession]
+        :param chunk_size: The number of contacts fetched per round trip.
+        :type chunk_size: int
+        :return: Chunks of the JSON document.
+        :rtype: AsyncIterator[bytes]
+        """
+        profile = schemas.UserModel.model_validate(user, from_attributes=True).model_dump(mode="json")
+        fields = b",".join(orjson.dumps(name) + b":" + orjson.dumps(value) for name, value in profile.items())
+        yield b"{" + fields + b',"contacts":['
+        stmt = select(self.contact_model).where(self.contact_model.user_id == user.id).order_by(self.contact_model.id)
+        async with session_factory() as db:
+            contacts = await db.stream_scalars(stmt.execution_options(yield_per=chunk_size))
+            separator = b""
+            async for partition in contacts.partitions():
+                chunk = b",".join(ContactResponse.model_validate(contact).model_dump_json().encode() for contact in partition)
+                yield separator + chunk
+                separator = b","
+        yield b"]}"
\ No newline at end of file
@@ -1,6 +1,6 @@
 from app.db import Base
 from sqlalchemy import Integer, String, DateTime, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, WriteOnlyMapped, mapped_column, relationship
 from datetime import datetime
 from typing import List, TYPE_CHECKING
 
@@ -14,15 +14,22 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(250), unique=True)
     password: Mapped[str] = mapped_column(String)
     avatar: Mapped[str] = mapped_column(String, nullable=True)
+    avatar_hash: Mapped[str] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now())
     contacts: Mapped[List["Contact"]] = relationship(back_populates="user")
-    tokens: Mapped[List["Token"]] = relationship(back_populates="user")
+    # never loaded as a whole, tokens are inserted and queried directly
+    tokens: WriteOnlyMapped["Token"] = relationship(back_populates="user", passive_deletes=True)
     confirmed_at: Mapped[bool] = mapped_column(DateTime, nullable=True)
+    # incremented whenever a contact of the user is created, updated or deleted
+    contacts_version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
 
 class Token(Base):
     __tablename__ = "tokens"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    token: Mapped[str] = mapped_column(String, nullable=False)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), onupdate='CASCADE')
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    # refresh tokens rotated from the same login share a family, reusing a rotated one revokes it
+    family: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), onupdate='CASCADE', index=True)
     user: Mapped["User"] = relationship(back_populates="tokens")
     
\ No newline at end of file
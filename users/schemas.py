@@ -1,7 +1,5 @@
 from pydantic import Field, BaseModel, EmailStr
 from datetime import datetime
-from contacts.schemas import ContactResponse
-from typing import List
 
 class UserCreationModel(BaseModel):
     username: str = Field(min_length=5, max_length=16, pattern="^\\w+$")
@@ -16,7 +14,7 @@ class UserModel(BaseModel):
     created_at: datetime
 
 class UserResponse(UserModel):
-    contacts: List[ContactResponse]
+    contacts_count: int = 0
 
     class Config:
         from_attributes = True
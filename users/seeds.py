@@ -1,51 +1,36 @@
-from sqlalchemy.orm import Session
-from app.db import get_db
-from users.auth import auth
-from users.models import User
 from libgravatar import Gravatar
-from datetime import timedelta, datetime
-from typing import List
-import faker
+from contacts.seeds import fake_pools
+from datetime import datetime
 import csv
-import contacts.models
+import io
+import random
 
-fake_data: faker.Faker = faker.Faker()
+COLUMNS = ("id", "username", "email", "password", "avatar", "created_at", "confirmed_at")
 
-COUNT_USERS = 20
+def generate_users(first_id: int, count: int, password_hash: str, seed: int) -> str:
+    """
+    Generates users with ids ``first_id .. first_id + count - 1`` as CSV rows of :data:`COLUMNS`.
+    Every user gets the same precomputed password hash and a unique email.
 
-def create_users(count: int) -> List[dict]:
-    users = []       
-    for _ in range(count):
-        profile = fake_data.profile()
-        avatar = None
-        try:
-            g = Gravatar(profile["mail"])
-            avatar = g.get_image()
-        except Exception as e:
-            print("Avatar exception:", e)
-        users.append({
-            "username": profile["username"],
-            "email": profile["mail"],
-            "avatar": avatar
-        })
-    return users
-
-def upload_contacts(db: Session, users: List[dict]) -> None:
-    header = ['email', 'password']
-    with open('users.csv', 'w') as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        for user_data in users:
-            password = fake_data.password()
-            writer.writerow([user_data['email'], password])
-            user = User(**user_data, password=auth.password.hash(password))
-            db.add(user)
-    db.commit()
-
-    
-def main():
-    users = create_users(COUNT_USERS)
-    upload_contacts(db=next(get_db()), users=users)
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+    :param first_id: The id of the first user.
+    :type first_id: int
+    :param count: The number of users.
+    :type count: int
+    :param password_hash: The hash of the synthetic password shared by the users.
+    :type password_hash: str
+    :param seed: The random seed.
+    :type seed: int
+    :return: CSV rows without a header.
+    :rtype: str
+    """
+    pools = fake_pools()
+    rand = random.Random(seed)
+    now = datetime.now()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for id in range(first_id, first_id + count):
+        username = f"{rand.choice(pools['first_names'])}.{rand.choice(pools['last_names'])}".lower()
+        # the id keeps emails unique across workers
+        email = f"{username}{id}@{rand.choice(pools['domains'])}"
+        writer.writerow((id, username, email, password_hash, Gravatar(email).get_image(), now, now))
+    return output.getvalue()
@@ -0,0 +1,15 @@
+from app.db import AsyncSessionLocal
+from app.settings import TOKEN_CONFIG
+from app.sweeper import BatchSweeper
+from users.models import Token
+from datetime import datetime
+
+class TokenSweeper(BatchSweeper):
+    """ Deletes expired refresh tokens, so concurrent refreshes are not blocked by a single large delete """
+    model = Token
+    swept = "expired refresh tokens"
+
+    def expired(self, now: datetime):
+        return self.model.expires_at <= now
+
+token_sweeper = TokenSweeper(AsyncSessionLocal, interval=TOKEN_CONFIG.sweep_interval, batch_size=TOKEN_CONFIG.sweep_batch_size)